@@ -408,15 +408,53 @@ class SequenceSample:
 
     def unpack(self):
         """Unpack a batch of data into individual pieces of data."""
-        partitions = [(i, i + 1) for i in range(self.bs)]
-        return self.split_with_spec(SequenceSplitSpec(partitions=partitions))
+        # Equivalent to `split_with_spec` with unit partitions, but each tensor
+        # is split with a single `torch.split` instead of per-piece slicing.
+        for k, v in self.metadata.items():
+            if not isinstance(v, list):
+                raise ValueError(f"Unknown how to split non-list metadata: ({k}, {v}).")
+        if self.data is not None:
+            split_data = {
+                k: (
+                    v.split([sum(lens) for lens in self.seqlens[k]], dim=0)
+                    if v is not None
+                    else None
+                )
+                for k, v in self.data.items()
+            }
+        samples = []
+        for i in range(self.bs):
+            if self.data is not None:
+                new_data = {
+                    k: vs[i] if vs is not None else None for k, vs in split_data.items()
+                }
+            else:
+                new_data = None
+            with self.disable_validation():
+                samples.append(
+                    SequenceSample(
+                        dtypes=self.dtypes,
+                        trailing_shapes=self.trailing_shapes,
+                        keys=self.keys,
+                        ids=self.ids[i : i + 1],
+                        seqlens={
+                            k: lens_list[i : i + 1]
+                            for k, lens_list in self.seqlens.items()
+                        },
+                        data=new_data,
+                        metadata={k: v[i : i + 1] for k, v in self.metadata.items()},
+                    )
+                )
+        return samples
 
     def cuda(self):
         """Move the data to GPU inplace."""
         if self.data is None:
             return self
+        device = torch.device("cuda", torch.cuda.current_device())
         self.data = {
-            k: v.cuda() if v is not None else None for k, v in self.data.items()
+            k: v.cuda() if v is not None and v.device != device else v
+            for k, v in self.data.items()
         }
         return self
 
@@ -1,6 +1,6 @@
 import logging.config
 import os
-from logging import WARNING, Logger, Manager, RootLogger
+from logging import DEBUG, WARNING, Logger, Manager, RootLogger
 from typing import Literal, Optional
 
 import colorlog
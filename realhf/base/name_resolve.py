@@ -30,6 +30,14 @@ class NameEntryNotFoundError(Exception):
 
 
 class NameRecordRepository:
+    # Pending add_async() writes are collected for this long before being
+    # issued, so that bursts of updates to the same name collapse into one.
+    ASYNC_COALESCE_SECONDS = 0.005
+
+    def __init__(self):
+        self.__async_lock = threading.Lock()
+        self.__async_pending = {}
+        self.__async_writer = None
 
     def __del__(self):
         try:
@@ -74,6 +82,42 @@ class NameRecordRepository:
         """
         raise NotImplementedError()
 
+    def add_async(self, name, value, **kwargs):
+        """Same as add(), but the write is issued by a background thread.
+
+        Pending writes to the same name are coalesced and only the latest
+        value is written. Errors are logged instead of raised. Call flush()
+        to wait until all pending writes are done.
+        """
+        with self.__async_lock:
+            self.__async_pending[name] = (value, kwargs)
+            if self.__async_writer is None:
+                self.__async_writer = threading.Thread(
+                    target=self.__async_writer_run, daemon=True
+                )
+                self.__async_writer.start()
+
+    def flush(self):
+        """Waits until all writes issued by add_async() are done."""
+        with self.__async_lock:
+            writer = self.__async_writer
+        if writer is not None:
+            writer.join()
+
+    def __async_writer_run(self):
+        while True:
+            time.sleep(self.ASYNC_COALESCE_SECONDS)
+            with self.__async_lock:
+                pending, self.__async_pending = self.__async_pending, {}
+                if len(pending) == 0:
+                    self.__async_writer = None
+                    return
+            for name, (value, kwargs) in pending.items():
+                try:
+                    self.add(name, value, **kwargs)
+                except Exception as e:
+                    logger.error(f"Failed to asynchronously add name {name}: {e}")
+
     def add_subentry(self, name, value, **kwargs):
         """Adds a sub-entry to the key-root `name`.
 
@@ -134,7 +178,11 @@ class NameRecordRepository:
 
     def reset(self):
         """Deletes all entries added via this repository instance's
-        add(delete_on_exit=True)."""
+        add(delete_on_exit=True).
+
+        Implementations should call flush() first, such that pending
+        add_async() writes are also deleted.
+        """
         raise NotImplementedError()
 
     def watch_names(
@@ -186,6 +234,7 @@ class MemoryNameRecordRepository(NameRecordRepository):
     """
 
     def __init__(self, log_events=False):
+        super().__init__()
         self.__store = {}
         self.__log_events = log_events
 
@@ -259,6 +308,7 @@ class MemoryNameRecordRepository(NameRecordRepository):
         return rs
 
     def reset(self):
+        self.flush()
         self.__store = {}
 
 
@@ -266,6 +316,7 @@ class NfsNameRecordRepository(NameRecordRepository):
     RECORD_ROOT = f"{cluster_spec.fileroot}/name_resolve/"
 
     def __init__(self, **kwargs):
+        super().__init__()
         self.__to_delete = set()
 
     @staticmethod
@@ -346,6 +397,7 @@ class NfsNameRecordRepository(NameRecordRepository):
         return rs
 
     def reset(self):
+        self.flush()
         for name in list(self.__to_delete):
             try:
                 self.delete(name)
@@ -462,6 +514,7 @@ class RedisNameRecordRepository(NameRecordRepository):
             return list(sorted(self.__find_subtree_locked(name_root)))
 
     def reset(self):
+        self.flush()
         with self.__lock:
             count = 0
             for name in list(self.__entries):
@@ -514,6 +567,8 @@ def make_repository(type_="nfs", **kwargs):
 DEFAULT_REPOSITORY_TYPE = "nfs"
 DEFAULT_REPOSITORY = make_repository(DEFAULT_REPOSITORY_TYPE)
 add = DEFAULT_REPOSITORY.add
+add_async = DEFAULT_REPOSITORY.add_async
+flush = DEFAULT_REPOSITORY.flush
 add_subentry = DEFAULT_REPOSITORY.add_subentry
 delete = DEFAULT_REPOSITORY.delete
 clear_subtree = DEFAULT_REPOSITORY.clear_subtree
@@ -527,10 +582,12 @@ watch_names = DEFAULT_REPOSITORY.watch_names
 
 def reconfigure(*args, **kwargs):
     global DEFAULT_REPOSITORY, DEFAULT_REPOSITORY_TYPE
-    global add, add_subentry, delete, clear_subtree, get, get_subtree, find_subtree, wait, reset, watch_names
+    global add, add_async, flush, add_subentry, delete, clear_subtree, get, get_subtree, find_subtree, wait, reset, watch_names
     DEFAULT_REPOSITORY = make_repository(*args, **kwargs)
     DEFAULT_REPOSITORY_TYPE = args[0]
     add = DEFAULT_REPOSITORY.add
+    add_async = DEFAULT_REPOSITORY.add_async
+    flush = DEFAULT_REPOSITORY.flush
     add_subentry = DEFAULT_REPOSITORY.add_subentry
     delete = DEFAULT_REPOSITORY.delete
     clear_subtree = DEFAULT_REPOSITORY.clear_subtree
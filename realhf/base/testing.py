@@ -227,13 +227,14 @@ def clear_name_resolve(expr_name=None, trial_name=None):
 def pytorch_memory_burnin(rank):
     torch.cuda.set_device(0)
     torch.cuda.init()
-    x = torch.randn(1, device="cuda", dtype=torch.float64, requires_grad=True)
-    y = x * torch.randn(1000, device="cuda", dtype=torch.float64)
+    # Warm up cuBLAS and autograd with the half precision used by models.
+    x = torch.randn(1024, 1024, device="cuda", dtype=torch.float16, requires_grad=True)
+    y = x @ x.new_ones(1024, 1)
     y.mean().backward()
+    # The tensors are freed by reference counting, no need to collect garbage.
     del x, y
-    gc.collect()
+    torch.cuda.synchronize()
     torch.cuda.empty_cache()
-    gc.collect()
 
 
 def clear_gpu_cache():
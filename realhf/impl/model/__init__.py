@@ -11,6 +11,7 @@ from realhf.api.core.model_api import HF_MODEL_FAMILY_REGISTRY
 from realhf.base.importing import import_module
 from realhf.impl.model.conversion.hf_registry import HFModelRegistry
 from realhf.impl.model.nn.real_llm_api import ReaLModel
+from realhf.impl.model.utils.jit import TORCH_JIT_NVFUSER_DEPRECATED
 
 logger = logging.getLogger("model init")
 
@@ -22,7 +23,9 @@ import_module(os.path.join(_filepath, "interface"), _p)
 import_module(os.path.join(_filepath, "nn"), _p)
 
 # Set PyTorch JIT options, following Megatron-LM.
-if torch.cuda.is_available():
+# On PyTorch >= 2.2, pointwise kernels are fused by torch.compile instead
+# (see realhf.impl.model.utils.jit).
+if torch.cuda.is_available() and not TORCH_JIT_NVFUSER_DEPRECATED:
     torch._C._jit_set_profiling_executor(True)
     torch._C._jit_set_profiling_mode(True)
     torch._C._jit_override_can_fuse_on_cpu(False)
@@ -32,38 +35,37 @@ if torch.cuda.is_available():
     torch._C._debug_set_autodiff_subgraph_inlining(False)
 
 # Add HuggingFace hooks to ReaLModel.
+# Kept for introspection only. The hooks below bind the registry object
+# directly instead of looking it up by name on every call.
 _HF_REGISTRIES = {}
 
 
 def _load_from_hf(
-    model: ReaLModel, registry_name, load_dir: str, init_critic_from_actor: bool
+    model: ReaLModel, r: HFModelRegistry, load_dir: str, init_critic_from_actor: bool
 ):
-    r = _HF_REGISTRIES[registry_name]
     setattr(
         model,
         "save_to_hf",
-        functools.partial(_save_to_hf, model, registry_name),
+        functools.partial(_save_to_hf, model, r),
     )
     return r.load(model, load_dir, init_critic_from_actor)
 
 
-def _save_to_hf(model: ReaLModel, registry_name, tokenizer, save_dir: str):
-    r = _HF_REGISTRIES[registry_name]
+def _save_to_hf(model: ReaLModel, r: HFModelRegistry, tokenizer, save_dir: str):
     r.save(model, tokenizer, save_dir)
 
 
-def _config_from_hf(registry_name, hf_config=None, model_path=None, is_critic=False):
-    r = _HF_REGISTRIES[registry_name]
+def _config_from_hf(
+    r: HFModelRegistry, hf_config=None, model_path=None, is_critic=False
+):
     return r.config_from_hf(hf_config, model_path, is_critic)
 
 
-def _config_to_hf(registry_name, config):
-    r = _HF_REGISTRIES[registry_name]
+def _config_to_hf(r: HFModelRegistry, config):
     return r.config_to_hf(config)
 
 
-def _make_real_config(registry_name):
-    r = _HF_REGISTRIES[registry_name]
+def _make_real_config(registry_name, r: HFModelRegistry):
     if r.real_config_maker is not None:
         return r.real_config_maker()
     raise NotImplementedError(
@@ -76,18 +78,18 @@ def _make_real_config(registry_name):
 for name, helpers in HF_MODEL_FAMILY_REGISTRY.items():
     _HF_REGISTRIES[name] = r = HFModelRegistry(**helpers)
 
-    _load_from_hf_ = functools.partialmethod(_load_from_hf, name)
+    _load_from_hf_ = functools.partialmethod(_load_from_hf, r)
     setattr(ReaLModel, f"from_{name}", _load_from_hf_)
 
-    _save_to_hf_ = functools.partialmethod(_save_to_hf, name)
+    _save_to_hf_ = functools.partialmethod(_save_to_hf, r)
     setattr(ReaLModel, f"to_{name}", _save_to_hf_)
 
-    _config_from_hf_ = functools.partial(_config_from_hf, name)
+    _config_from_hf_ = functools.partial(_config_from_hf, r)
     setattr(ReaLModel, f"config_from_{name}", staticmethod(_config_from_hf_))
 
-    _config_to_hf_ = functools.partial(_config_to_hf, name)
+    _config_to_hf_ = functools.partial(_config_to_hf, r)
     setattr(ReaLModel, f"config_to_{name}", staticmethod(_config_to_hf_))
 
     # make a ReaLModelConfig from only parameters related to model size, used for testing
-    _make_real_config_ = functools.partial(_make_real_config, name)
+    _make_real_config_ = functools.partial(_make_real_config, name, r)
     setattr(ReaLModel, f"make_{name}_config", staticmethod(_make_real_config_))
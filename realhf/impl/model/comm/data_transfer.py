@@ -1,5 +1,6 @@
 import dataclasses
 import itertools
+import math
 from typing import *
 
 import torch
@@ -7,10 +8,16 @@ import torch.distributed as dist
 
 from realhf.api.core.config import ModelName, ModelShardID
 from realhf.api.core.data_api import SequenceSample
-from realhf.base import topology
+from realhf.base import constants, topology
 from realhf.impl.model.comm.global_comm import filter_match_mwids
 from realhf.impl.model.comm.param_realloc import pipeline_repartition_strategy
 
+# Send steps gather their data into one of this many reused staging buffers
+# per dtype, taking turns, such that one buffer can be filled while the other
+# is still being sent. The staging memory is thus bounded by this number times
+# the largest gathered send of each dtype, however long the transfer plan is.
+_N_SEND_BUFFERS = 2
+
 
 @dataclasses.dataclass(unsafe_hash=True)
 class DataTransferPair:
@@ -101,12 +108,40 @@ def setup_data_transfer(
     )
 
 
+def warmup_data_transfer(data_transfer_info: DataTransferInfo):
+    """Run a tiny transfer over every data transfer group this rank belongs
+    to.
+
+    NCCL sets up communicators lazily upon their first use, which can
+    take a long time. Warming them up moves this cost out of the first
+    training step. Both the collective communicator (used by broadcasts
+    and ``broadcast_object_list``) and, for groups of two ranks, the
+    point-to-point communicator are warmed. All ranks should call this
+    function collectively.
+    """
+    rank = dist.get_rank()
+    pending = []
+    for key, group in data_transfer_info.data_transfer_groups.items():
+        src = data_transfer_info.data_transfer_src_ranks[key]
+        dst_ranks = data_transfer_info.data_transfer_dst_ranks[key]
+        # `group` is a placeholder on ranks outside of it, so we decide
+        # the membership from the rank tables instead.
+        if rank != src and rank not in dst_ranks:
+            continue
+        buf = torch.zeros(1, dtype=torch.long, device=torch.cuda.current_device())
+        pending.append(dist.broadcast(buf, src=src, group=group, async_op=True))
+        _issue_transfer([buf], rank, src, group, pending)
+    for work in pending:
+        work.wait()
+    torch.cuda.synchronize()
+
+
 @dataclasses.dataclass
 class DataTransferSenderStep:
     rank: int
     dst_ranks: List[int]
     group: dist.ProcessGroup
-    key: str
+    keys: List[str]
     ids: List[int]
 
 
@@ -116,7 +151,7 @@ class DataTransferReceiverStep:
     src: int
     dst_ranks: List[int]
     group: dist.ProcessGroup
-    key: str
+    keys: List[str]
     ids: List[int]
 
 
@@ -129,11 +164,23 @@ def derive_data_transfer_plan(
     producer_mappings: Dict[Tuple[ModelName, str], Dict[int, List[int]]],
     data_transfer_info: DataTransferInfo,
 ) -> List[DataTransferReceiverStep | DataTransferSenderStep]:
-    comm_plan = []
-
+    # Keys with the same producer and the same producer mapping
+    # are sent over the same groups with the same ids,
+    # so we transfer them in the same step.
+    key_groups: Dict[Tuple, List[str]] = {}
     for k in keys:
         producer_name = producer_names[k]
         producer_mapping = producer_mappings[(producer_name, k)]
+        mapping_key = tuple(
+            (dp_rank, tuple(slots)) for dp_rank, slots in producer_mapping.items()
+        )
+        key_groups.setdefault((producer_name, mapping_key), []).append(k)
+
+    comm_plan = []
+
+    for step_keys in key_groups.values():
+        producer_name = producer_names[step_keys[0]]
+        producer_mapping = producer_mappings[(producer_name, step_keys[0])]
 
         # partition mapping starts from zero, which is different from buffer indices
         repart_strat = pipeline_repartition_strategy(producer_mapping, consumer_mapping)
@@ -161,7 +208,7 @@ def derive_data_transfer_plan(
                         src=bcast_src,
                         dst_ranks=dst_ranks,
                         group=group,
-                        key=k,
+                        keys=step_keys,
                         ids=ids,
                     )
                 )
@@ -171,7 +218,7 @@ def derive_data_transfer_plan(
                     rank=bcast_src,
                     dst_ranks=dst_ranks,
                     group=group,
-                    key=k,
+                    keys=step_keys,
                     ids=ids,
                 )
             )
@@ -179,145 +226,333 @@ def derive_data_transfer_plan(
     return comm_plan
 
 
+def _group_keys_by_dtype(
+    keys: List[str], dtypes: Dict[str, torch.dtype]
+) -> Dict[torch.dtype, List[str]]:
+    # Keys are flattened and concatenated into a single buffer per dtype,
+    # such that each step issues one broadcast per dtype instead of one per key.
+    # The order of keys is preserved, so the sender and receivers agree on the layout.
+    groups = {}
+    for k in keys:
+        groups.setdefault(dtypes[k], []).append(k)
+    return groups
+
+
+def _as_contiguous_view(tensors: List[torch.Tensor]) -> Optional[torch.Tensor]:
+    # Returns the concatenation of 1D `tensors` as a view without copying,
+    # if they are adjacent slices of the same storage. Returns None otherwise.
+    first = tensors[0]
+    storage_ptr = first.untyped_storage().data_ptr()
+    ptr = first.data_ptr()
+    for t in tensors:
+        if (
+            not t.is_contiguous()
+            or t.data_ptr() != ptr
+            or t.untyped_storage().data_ptr() != storage_ptr
+        ):
+            return None
+        ptr += t.numel() * t.element_size()
+    return first.as_strided((sum(t.numel() for t in tensors),), (1,))
+
+
+def _copy_to_cuda(tensors: List[torch.Tensor]) -> List[torch.Tensor]:
+    # Copy CPU tensors to GPU with a single host-to-device copy.
+    # The returned tensors are views of the copied one.
+    flat_tensors = [t.flatten() for t in tensors]
+    # Pieces of the same loaded batch are usually adjacent,
+    # so they can be copied without gathering them first.
+    packed = _as_contiguous_view(flat_tensors)
+    if packed is None:
+        packed = torch.cat(flat_tensors, dim=0)
+    packed = packed.cuda(non_blocking=True)
+    pieces = packed.split([t.numel() for t in tensors], dim=0)
+    return [piece.view(t.shape) for t, piece in zip(tensors, pieces)]
+
+
+def _move_to_cuda_(storage: Dict[int, SequenceSample], ids: List[int], keys: List[str]):
+    # Move the stored data of `ids` to GPU inplace, with a single host-to-device
+    # copy per key. The stored tensors are replaced by views of the copied one.
+    for k in keys:
+        cpu_ids = [
+            _id
+            for _id in ids
+            if storage[_id].data[k] is not None and not storage[_id].data[k].is_cuda
+        ]
+        if len(cpu_ids) == 0:
+            continue
+        tensors = _copy_to_cuda([storage[_id].data[k] for _id in cpu_ids])
+        for _id, t in zip(cpu_ids, tensors):
+            storage[_id].data[k] = t
+
+
+def _issue_transfer(
+    tensors: List[torch.Tensor],
+    rank: int,
+    src: int,
+    group: dist.ProcessGroup,
+    pending: List,
+):
+    # Broadcast `tensors` from `src` to all ranks in `group` asynchronously.
+    # A broadcast within a group of two ranks is a point-to-point transfer,
+    # so we issue all tensors as a single batch of P2P ops instead.
+    if len(tensors) == 0:
+        return
+    ranks = dist.get_process_group_ranks(group)
+    if len(ranks) == 2:
+        if rank == src:
+            op, peer = dist.isend, ranks[0] if ranks[1] == src else ranks[1]
+        else:
+            op, peer = dist.irecv, src
+        pending.extend(
+            dist.batch_isend_irecv(
+                [dist.P2POp(op, t, peer, group=group) for t in tensors]
+            )
+        )
+    else:
+        for t in tensors:
+            pending.append(dist.broadcast(t, src=src, group=group, async_op=True))
+
+
+def _is_transferred(
+    table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
+    ids: List[int],
+    key: str,
+    group: Tuple[int, FrozenSet[int]],
+) -> bool:
+    # The tables record the (source, destination ranks) of every group that has
+    # transferred the data. The sender and all receivers of a group take part
+    # in the same transfers over it, so their records of the group always agree
+    # and they skip exactly the same keys.
+    return all(group in table[_id][key] for _id in ids)
+
+
+def _mark_transferred(
+    table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
+    ids: List[int],
+    keys: List[str],
+    group: Tuple[int, FrozenSet[int]],
+):
+    for _id in ids:
+        for k in keys:
+            table[_id][k].add(group)
+        table[_id]["__metadata__"].add(group)
+
+
+def _run_receiver_step(
+    step: DataTransferReceiverStep,
+    meta_sample: SequenceSample,
+    id2idx: Dict[int, int],
+    storage: Dict[int, SequenceSample],
+    received_worker_idx_table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
+    pending: List,
+):
+    ids = step.ids
+    if step.src == step.rank:
+        # The receiver is also a sender.
+        # We can directly use the data without comm.
+        _move_to_cuda_(storage, ids, step.keys)
+        return
+
+    # If we have to receive remote data, we first check whether
+    # the data has been sent here in previous function calls.
+    # If so, just fetch it from the cache.
+    group = (step.src, frozenset(step.dst_ranks))
+    keys = [
+        k
+        for k in step.keys
+        if not _is_transferred(received_worker_idx_table, ids, k, group)
+    ]
+    if len(keys) == 0:
+        return
+
+    metadata_cached = _is_transferred(
+        received_worker_idx_table, ids, "__metadata__", group
+    )
+
+    idx = [id2idx[_id] for _id in ids]
+    # The length of each received piece, per key.
+    piece_lens = {k: [sum(meta_sample.seqlens[k][i]) for i in idx] for k in keys}
+    total_lens = {k: sum(lens) for k, lens in piece_lens.items()}
+
+    # Receive data if it is not None.
+    bufs = {k: None for k in keys}
+    flat_bufs = []
+    data_keys = [k for k in keys if meta_sample.trailing_shapes[k] is not None]
+    dtype_groups = _group_keys_by_dtype(data_keys, meta_sample.dtypes)
+    for dtype, dtype_keys in dtype_groups.items():
+        shapes = [(total_lens[k], *meta_sample.trailing_shapes[k]) for k in dtype_keys]
+        numels = [math.prod(shape) for shape in shapes]
+        # The buffer is fully overwritten by the broadcast, so skip zero-filling.
+        flat_buf = torch.empty(
+            sum(numels),
+            dtype=dtype,
+            device=torch.cuda.current_device(),
+        )
+        flat_bufs.append(flat_buf)
+        for k, shape, buf in zip(dtype_keys, shapes, flat_buf.split(numels)):
+            bufs[k] = buf.view(shape)
+    _issue_transfer(flat_bufs, step.rank, step.src, step.group, pending)
+
+    # Receive metadata if not cached.
+    metadatas = [{} for _ in ids]
+    if not metadata_cached:
+        dist.broadcast_object_list(metadatas, src=step.src, group=step.group)
+
+    # Mark that the data has been received.
+    _mark_transferred(received_worker_idx_table, ids, keys, group)
+
+    # Split the received data and put it into the storage.
+    pieces = {
+        k: (
+            bufs[k].split(piece_lens[k], dim=0)
+            if bufs[k] is not None
+            else [None] * len(ids)
+        )
+        for k in keys
+    }
+    # All pieces share the dtypes and trailing shapes of the received buffers.
+    dtypes = {k: bufs[k].dtype if bufs[k] is not None else None for k in keys}
+    trailing_shapes = {
+        k: bufs[k].shape[1:] if bufs[k] is not None else None for k in keys
+    }
+    for i, (_id, metadata) in enumerate(zip(ids, metadatas)):
+        seqlens = {k: [meta_sample.seqlens[k][idx[i]]] for k in keys}
+        data = {k: pieces[k][i] for k in keys}
+        with SequenceSample.disable_validation():
+            s = SequenceSample(
+                keys=keys,
+                dtypes=dict(dtypes),
+                trailing_shapes=dict(trailing_shapes),
+                ids=[_id],
+                seqlens=seqlens,
+                data=data,
+                metadata=metadata,
+            )
+        if _id in storage:
+            storage[_id].update_(s)
+        else:
+            storage[_id] = s
+
+
+def _run_sender_step(
+    step: DataTransferSenderStep,
+    storage: Dict[int, SequenceSample],
+    sent_worker_idx_table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
+    pending: List,
+    buf_name: str,
+):
+    # Similar to the receiver, we first check whether the data has been sent over this group.
+    group = (step.rank, frozenset(step.dst_ranks))
+    keys = [
+        k
+        for k in step.keys
+        if not _is_transferred(sent_worker_idx_table, step.ids, k, group)
+    ]
+    if len(keys) == 0:
+        return
+    metadata_cached = _is_transferred(
+        sent_worker_idx_table, step.ids, "__metadata__", group
+    )
+
+    # If not cached, we fetch the data from the storage and send it to all destinations.
+    if step.rank in step.dst_ranks:
+        # The data will also be consumed locally, so keep the GPU copy in the storage.
+        _move_to_cuda_(storage, step.ids, keys)
+    data = {k: [storage[_id].data[k] for _id in step.ids] for k in keys}
+    # Decide which keys carry data in the same way as the receivers, i.e.,
+    # by their trailing shapes, such that both sides agree on the buffer layout.
+    sample = storage[step.ids[0]]
+    data_keys = [k for k in keys if sample.trailing_shapes[k] is not None]
+    for k in data_keys:
+        if any(v is None for v in data[k]):
+            raise ValueError(
+                f"Key {k} has a trailing shape {sample.trailing_shapes[k]}, "
+                f"but some of its data with ids {step.ids} is None."
+            )
+    for k in data_keys:
+        cpu_idx = [i for i, v in enumerate(data[k]) if not v.is_cuda]
+        if len(cpu_idx) == 0:
+            continue
+        # Otherwise, send a temporary GPU copy and keep the storage on CPU,
+        # such that the copy is released as soon as the transfer completes
+        # instead of occupying GPU memory until the data cache is cleared.
+        cuda_tensors = _copy_to_cuda([data[k][i] for i in cpu_idx])
+        for i, t in zip(cpu_idx, cuda_tensors):
+            data[k][i] = t
+    dtypes = {k: sample.dtypes[k] for k in data_keys}
+    send_bufs = []
+    for dtype, dtype_keys in _group_keys_by_dtype(data_keys, dtypes).items():
+        tensors = [v.flatten() for k in dtype_keys for v in data[k]]
+        # Data that is stored contiguously, e.g., pieces of the same batch,
+        # can be sent as is.
+        vs = _as_contiguous_view(tensors)
+        if vs is None:
+            # Gather into a reused buffer instead of allocating a new one for every
+            # transfer. The caller ensures that the previous sends from this
+            # buffer have been waited.
+            vs = constants.get_global_memory_buffer().get_tensor(
+                (sum(t.numel() for t in tensors),), dtype, buf_name
+            )
+            torch.cat(tensors, dim=0, out=vs)
+        send_bufs.append(vs)
+    _issue_transfer(send_bufs, step.rank, step.rank, step.group, pending)
+
+    if not metadata_cached:
+        dist.broadcast_object_list(
+            [storage[_id].metadata for _id in step.ids],
+            src=step.rank,
+            group=step.group,
+        )
+
+    _mark_transferred(sent_worker_idx_table, step.ids, keys, group)
+
+
 def run_data_transfer(
     comm_plan: List[DataTransferReceiverStep | DataTransferSenderStep],
-    meta_samples: Dict[int, SequenceSample],
+    meta_sample: SequenceSample,
     storage: Dict[int, SequenceSample],
-    sent_worker_idx_table: Dict[int, Dict[str, Set[int]]],
-    received_worker_idx_table: Dict[int, Dict[str, Set[int]]],
+    sent_worker_idx_table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
+    received_worker_idx_table: Dict[int, Dict[str, Set[Tuple[int, FrozenSet[int]]]]],
 ) -> Tuple[Set[int], Set[str]]:
+    # Broadcasts are issued asynchronously, such that transfers over different
+    # groups can overlap. All ranks issue them in the order of the plan.
+    # Received tensors are put into the storage immediately, but they
+    # are only valid after the pending works are waited below.
+    rank = dist.get_rank()
+    # Look up the metadata of each piece by its index in the batch,
+    # instead of unpacking the batch into individual samples.
+    id2idx = {_id: i for i, _id in enumerate(meta_sample.ids)}
+    pending = []
+    n_send_steps = 0
+    # The works issued by the last send step that used each staging buffer.
+    send_buf_works = [[] for _ in range(_N_SEND_BUFFERS)]
     for step in comm_plan:
 
-        if isinstance(step, DataTransferReceiverStep) and step.rank == dist.get_rank():
-            ids = step.ids
-            if step.src == dist.get_rank():
-                # The receiver is also a sender.
-                # We can directly use the data without comm.
-                for _id in step.ids:
-                    if storage[_id].data[step.key] is not None:
-                        storage[_id].data[step.key] = storage[_id].data[step.key].cuda()
-            else:
-                # If we have to receive remote data, we first check whether
-                # the data has been sent here in previous function calls.
-                # If so, just fetch it from the cache.
-                cached = all(
-                    [
-                        set(step.dst_ranks).issubset(
-                            set(received_worker_idx_table[_id][step.key])
-                        )
-                        for _id in ids
-                    ]
-                )
-
-                metadata_cached = all(
-                    [
-                        set(step.dst_ranks).issubset(
-                            set(received_worker_idx_table[_id]["__metadata__"])
-                        )
-                        for _id in ids
-                    ]
-                )
-                if cached:
-                    pass
-                else:
-                    dtype = meta_samples[ids[0]].dtypes[step.key]
-                    total_len = sum(
-                        sum(meta_samples[_id].seqlens[step.key][0]) for _id in ids
-                    )
-                    trailing_shape = meta_samples[ids[0]].trailing_shapes[step.key]
-
-                    # Receive data if it is not None.
-                    if trailing_shape is not None:
-                        buf = torch.zeros(
-                            (total_len, *trailing_shape),
-                            dtype=dtype,
-                            device=torch.cuda.current_device(),
-                        )
-                        dist.broadcast(buf, src=step.src, group=step.group)
-                    else:
-                        buf = None
-
-                    # Receive metadata if not cached.
-                    if not metadata_cached:
-                        metadatas = [{} for _ in step.ids]
-                        dist.broadcast_object_list(
-                            metadatas, src=step.src, group=step.group
-                        )
-
-                    # Mark that the data has been received.
-                    for _id in ids:
-                        received_worker_idx_table[_id][step.key].union(step.dst_ranks)
-                        received_worker_idx_table[_id]["__metadata__"].union(
-                            step.dst_ranks
-                        )
-
-                    # Split the received data and put it into the storage.
-                    offset = 0
-                    for _id, metadata in zip(ids, metadatas):
-                        seqlens = meta_samples[_id].seqlens[step.key]
-                        assert len(seqlens) == 1
-                        seqlen = sum(seqlens[0])
-                        if buf is not None:
-                            vs = buf[offset : offset + seqlen]
-                        else:
-                            vs = None
-                        offset = offset + seqlen
-                        with SequenceSample.disable_validation():
-                            s = SequenceSample(
-                                keys=[step.key],
-                                dtypes={step.key: vs.dtype if vs is not None else None},
-                                trailing_shapes={
-                                    step.key: vs.shape[1:] if vs is not None else None
-                                },
-                                ids=[_id],
-                                seqlens={step.key: seqlens},
-                                data={step.key: vs},
-                                metadata=metadata,
-                            )
-                        if _id in storage:
-                            storage[_id].update_(s)
-                        else:
-                            storage[_id] = s
-
-        if isinstance(step, DataTransferSenderStep) and step.rank == dist.get_rank():
-            # Similar to the receiver, we first check whether the data has been sent to all destinations.
-            cached = all(
-                [
-                    set(step.dst_ranks).issubset(
-                        set(sent_worker_idx_table[_id][step.key])
-                    )
-                    for _id in step.ids
-                ]
+        if isinstance(step, DataTransferReceiverStep) and step.rank == rank:
+            _run_receiver_step(
+                step,
+                meta_sample,
+                id2idx,
+                storage,
+                received_worker_idx_table,
+                pending,
             )
-            metadata_cached = all(
-                [
-                    set(step.dst_ranks).issubset(
-                        set(sent_worker_idx_table[_id]["__metadata__"])
-                    )
-                    for _id in step.ids
-                ]
-            )
-            if cached:
-                pass
-            else:
-                # If not cached, we fetch the data from the storage and send it to all destinations.
-                for _id in step.ids:
-                    if storage[_id].data[step.key] is not None:
-                        storage[_id].data[step.key] = storage[_id].data[step.key].cuda()
-                if all([storage[_id].data[step.key] is not None for _id in step.ids]):
-                    vs = torch.cat(
-                        [storage[_id].data[step.key] for _id in step.ids],
-                        dim=0,
-                    )
-                    dist.broadcast(vs, src=step.rank, group=step.group)
 
-                if not metadata_cached:
-                    dist.broadcast_object_list(
-                        [storage[_id].metadata for _id in step.ids],
-                        src=step.rank,
-                        group=step.group,
-                    )
+        if isinstance(step, DataTransferSenderStep) and step.rank == rank:
+            slot = n_send_steps % _N_SEND_BUFFERS
+            # Do not overwrite a staging buffer that is still being sent.
+            for work in send_buf_works[slot]:
+                work.wait()
+            n_pending = len(pending)
+            _run_sender_step(
+                step,
+                storage,
+                sent_worker_idx_table,
+                pending,
+                buf_name=f"data_transfer_send_{slot}",
+            )
+            send_buf_works[slot] = pending[n_pending:]
+            n_send_steps += 1
 
-                for _id in step.ids:
-                    sent_worker_idx_table[_id][step.key].union(step.dst_ranks)
-                    sent_worker_idx_table[_id]["__metadata__"].union(step.dst_ranks)
+    for work in pending:
+        work.wait()
@@ -226,8 +226,8 @@ class PPOActorInterface(model_api.ModelInterface):
             prompt_mask,
         ) = concat_prompt_to_generation_output(
             packed_prompts=input_.data["packed_prompts"],
-            prompt_lengths=torch.tensor(flat2d(input_.seqlens["packed_prompts"])).to(
-                model.device
+            prompt_lengths=torch.tensor(
+                flat2d(input_.seqlens["packed_prompts"]), device=model.device
             ),
             gen_tokens=gen_tokens,
             logprobs=logprobs,
@@ -235,7 +235,7 @@ class PPOActorInterface(model_api.ModelInterface):
             gen_lengths=gen_lengths,
         )
 
-        seqlens = [[s] for s in seq_lengths.cpu().numpy().tolist()]
+        seqlens = [[s] for s in seq_lengths.tolist()]
         data = dict(
             seq_no_eos_mask=seq_no_eos_mask,
             packed_input_ids=packed_input_ids,
@@ -271,7 +271,13 @@ class PPOActorInterface(model_api.ModelInterface):
             ):
                 apply_logits_mask(logits, input_.data["packed_logits_mask"])
 
-            input_lens = torch.tensor(input_.seqlens["packed_input_ids"]).view(-1)
+            # Build the lengths on the same device as the logits. Otherwise,
+            # the shift indices are built on CPU and copied per token.
+            input_lens = torch.tensor(
+                input_.seqlens["packed_input_ids"],
+                dtype=torch.int32,
+                device=logits.device,
+            ).view(-1)
             cu_seqlens = torch.nn.functional.pad(input_lens.cumsum(0), (1, 0)).int()
 
             logprobs = gather_packed_shifted_log_probs(
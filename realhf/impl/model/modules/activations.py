@@ -5,6 +5,8 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from realhf.impl.model.utils.jit import jit_fuser
+
 # 1/sqrt(2*pi)-> 0.3989423
 # 1/sqrt(2)   -> 0.70710678
 # sqrt(2/pi)  -> 0.79788456
@@ -13,7 +15,7 @@ import torch.nn.functional as F
 # this function is tanh approximation of gelu
 # actual gelu is:
 # x * 0.5 * (1.0 + torch.erf(x * 0.70710678))
-@torch.jit.script
+@jit_fuser
 def bias_gelu(y, bias):
     x = bias + y
     return (x * 0.5 * (1.0 + torch.tanh(0.79788456 * x * (1 + 0.044715 * x * x)))).to(
@@ -24,7 +26,7 @@ def bias_gelu(y, bias):
 # gradient of tanh approximation of gelu
 # gradient of actual gelu is:
 # 0.5 * (1. + torch.erf(x * 0.70710678)) + 0.3989423 * x * torch.exp(-0.5 * x * x)
-@torch.jit.script
+@jit_fuser
 def bias_gelu_back(g, y, bias):
     """Assume that y has shape (B, D) and bias has shape (D)"""
     x = bias + y
@@ -58,14 +60,14 @@ bias_gelu_impl = GeLUFunction.apply
 # this function is tanh approximation of gelu
 # actual gelu is:
 # x * 0.5 * (1.0 + torch.erf(x * 0.70710678))
-@torch.jit.script
+@jit_fuser
 def gelu_fwd(x):
     return (x * 0.5 * (1.0 + torch.tanh(0.79788456 * x * (1 + 0.044715 * x * x)))).to(
         dtype=x.dtype
     )
 
 
-@torch.jit.script
+@jit_fuser
 def new_gelu_activation(input: torch.Tensor) -> torch.Tensor:
     """Implementation of the GELU activation function currently in Google BERT
     repo (identical to OpenAI GPT).
@@ -88,7 +90,7 @@ def new_gelu_activation(input: torch.Tensor) -> torch.Tensor:
 # gradient of tanh approximation of gelu
 # gradient of actual gelu is:
 # 0.5 * (1. + torch.erf(x * 0.70710678)) + 0.3989423 * x * torch.exp(-0.5 * x * x)
-@torch.jit.script
+@jit_fuser
 def gelu_bwd(g, x):
     tanh_out = torch.tanh(0.79788456 * x * (1 + 0.044715 * x * x))
     # sqrt(2/pi) * 3 * 0.044715 -> 0.1070322243
@@ -116,18 +118,18 @@ class FastGeLUFunction(torch.autograd.Function):
 fast_gelu_impl = FastGeLUFunction.apply
 
 
-@torch.jit.script
+@jit_fuser
 def relu_bwd(g, x):
     return torch.where(x >= 0, g, 0.0).to(dtype=x.dtype)
 
 
-@torch.jit.script
+@jit_fuser
 def sqrelu_fwd(x):
     r = F.relu(x)
     return (r * r).to(dtype=x.dtype)
 
 
-@torch.jit.script
+@jit_fuser
 def sqrelu_bwd(g, x):
     return (2.0 * g * F.relu(x)).to(dtype=x.dtype)
 
@@ -157,7 +157,8 @@ def prepare_generate_inputs(
     layer_indices = range(module.layer_idx_start, module.layer_idx_end)
     min_layer_index = module.layer_idx_start
     bs = input_lens.shape[0]
-    cache_seqlens = input_lens.clone().to(dtype=torch.int32)
+    # `input_lens` is a fresh tensor, so it can be used without cloning.
+    cache_seqlens = input_lens.to(dtype=torch.int32)
 
     block_ys = ys
     assert len(layer_indices) == len(block_ys), (len(block_ys), layer_indices)
@@ -170,16 +171,31 @@ def prepare_generate_inputs(
         ys[-1].cache_seqlens = cache_seqlens
         block_ys = block_ys[:-1]
 
+    kvcache_seqlen = max(
+        constants.max_prompt_len() + gconfig.max_new_tokens,
+        module.config.hidden_dim // module.config.head_dim + 10,
+    )
+    if len(block_ys) > 0:
+        # The (batch, position) index of each packed token in the padded cache,
+        # shared by all layers. Unlike a boolean mask, scattering with these
+        # indices does not synchronize with the device.
+        total_seqlen = block_ys[0].k_cache.shape[0]
+        cache_batch_indices = torch.repeat_interleave(
+            torch.arange(bs, device=module.device, dtype=torch.long),
+            input_lens.long(),
+            output_size=total_seqlen,
+        )
+        cache_pos_indices = (
+            torch.arange(total_seqlen, device=module.device, dtype=torch.long)
+            - cu_seqlens[:-1].long()[cache_batch_indices]
+        )
+
     for y, layer_idx in zip(block_ys, layer_indices):
         assert (
             y.k_cache is not None
             and y.v_cache is not None
             and y.cache_seqlens is not None
         ), (y.k_cache is None, y.v_cache is None, y.cache_seqlens is None)
-        kvcache_seqlen = max(
-            constants.max_prompt_len() + gconfig.max_new_tokens,
-            module.config.hidden_dim // module.config.head_dim + 10,
-        )
         k_cache_handle = cuda_graph.input_buffer_handle(cuda_graph_name, "k_caches")
         v_cache_handle = cuda_graph.input_buffer_handle(cuda_graph_name, "v_caches")
         if k_cache_handle is not None and v_cache_handle is not None:
@@ -196,14 +212,8 @@ def prepare_generate_inputs(
                 dtype=y.v_cache.dtype,
                 device=y.v_cache.device,
             )
-        indices = (
-            torch.arange(kvcache_seqlen, device=module.device, dtype=torch.long)[
-                None, :
-            ]
-            < input_lens[:, None]
-        )
-        k_cache[indices] = y.k_cache
-        v_cache[indices] = y.v_cache
+        k_cache[cache_batch_indices, cache_pos_indices] = y.k_cache
+        v_cache[cache_batch_indices, cache_pos_indices] = y.v_cache
         y.k_cache = k_cache
         y.v_cache = v_cache
         y.cache_seqlens = cache_seqlens
@@ -464,18 +474,20 @@ def concat_prompt_to_generation_output(
 ]:
     device = packed_prompts.device
 
-    prompts_list, prompt_log_probs_list, prompt_logits_mask_list = [], [], []
+    prompt_log_probs_list, prompt_logits_mask_list = [], []
     gen_tokens_list, gen_log_probs_list, gen_logits_mask_list = [], [], []
 
     bs = prompt_lengths.shape[0]
-    prompt_cu_seqlens = torch.nn.functional.pad(prompt_lengths.cumsum(0), (1, 0))
+    # Copy all lengths to the host at once instead of calling `.item()`
+    # for every sequence, each of which synchronizes with the device.
+    prompt_lens, gen_lens = torch.stack(
+        [prompt_lengths.to(gen_lengths), gen_lengths]
+    ).tolist()
+    prompts_list = list(packed_prompts.split(prompt_lens))
     for i in range(bs):
-        prompt_len, gen_len = prompt_lengths[i].item(), gen_lengths[i].item()
+        prompt_len, gen_len = prompt_lens[i], gen_lens[i]
 
         # log_probs is one-step shorter than token sequences.
-        prompts_list.append(
-            packed_prompts[prompt_cu_seqlens[i] : prompt_cu_seqlens[i + 1]]
-        )
         prompt_log_probs_list.append(logprobs.new_zeros(prompt_len - 1))
         if logits_mask is not None:
             prompt_logits_mask_list.append(
@@ -522,8 +534,8 @@ def concat_prompt_to_generation_output(
         )
 
     prompt_mask = zip(
-        [torch.ones(plen, dtype=torch.bool, device=device) for plen in prompt_lengths],
-        [torch.zeros(glen, dtype=torch.bool, device=device) for glen in gen_lengths],
+        [torch.ones(plen, dtype=torch.bool, device=device) for plen in prompt_lens],
+        [torch.zeros(glen, dtype=torch.bool, device=device) for glen in gen_lens],
     )
     prompt_mask = torch.cat(list(itertools.chain.from_iterable(prompt_mask)))
 
@@ -0,0 +1,31 @@
+import functools
+
+import torch
+from packaging.version import Version
+
+# nvFuser is deprecated in TorchScript since PyTorch 2.2, so scripted
+# pointwise kernels would run unfused. Use torch.compile instead.
+TORCH_JIT_NVFUSER_DEPRECATED = Version(
+    Version(torch.__version__).base_version
+) >= Version("2.2.0")
+
+
+def _compile_fuser(fn):
+    # Packed inputs change their shapes almost every step (e.g., during decoding),
+    # so compile with dynamic shapes once instead of recompiling for each new shape.
+    compiled_fn = torch.compile(fn, dynamic=True)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # Compilation is not allowed during CUDA graph capture. Capture the eager
+        # kernels instead, since the graph replay removes the launch overhead anyway.
+        if torch.cuda.is_current_stream_capturing():
+            return fn(*args, **kwargs)
+        return compiled_fn(*args, **kwargs)
+
+    return wrapper
+
+
+jit_fuser = torch.jit.script
+if TORCH_JIT_NVFUSER_DEPRECATED and torch.cuda.is_available():
+    jit_fuser = _compile_fuser
@@ -1,6 +1,12 @@
-import dataclasses
+import asyncio
+import concurrent.futures
 import enum
-from typing import List, Optional
+import re
+import string
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from realhf.scheduler.commands import control_cmd, remote_worker_cmd, setup_cmd
 
 
 class JobState(enum.Enum):
@@ -12,7 +18,10 @@ class JobState(enum.Enum):
     CANCELLED = 5
 
     def active(self):
-        return self == self.PENDING or self == self.RUNNING
+        return self in _ACTIVE_JOB_STATES
+
+
+_ACTIVE_JOB_STATES = frozenset({JobState.PENDING, JobState.RUNNING})
 
 
 class SchedulerError(Exception):
@@ -22,15 +31,22 @@ class SchedulerError(Exception):
 class JobException(Exception):
 
     def __init__(self, run_name, worker_type, host, reason: JobState):
-        super().__init__(f"Job {run_name}:{worker_type} {reason} at node {host}")
+        # The message is only built in __str__, since the exception is often
+        # caught without being printed. Passing the fields as args keeps it
+        # picklable.
+        super().__init__(run_name, worker_type, host, reason)
         self.run_name = run_name
         self.worker_type = worker_type
         self.host = host
         self.reason = reason
 
+    def __str__(self):
+        return (
+            f"Job {self.run_name}:{self.worker_type} {self.reason} at node {self.host}"
+        )
 
-@dataclasses.dataclass
-class JobInfo:
+
+class JobInfo(NamedTuple):
     name: str
     state: JobState
     host: str = (
@@ -59,6 +75,51 @@ class SchedulerClient:
         """
         raise NotImplementedError()
 
+    def submit_batch(self, specs: List[Tuple[str, str]], fanout: int = 1, **kwargs):
+        """Submits a batch of jobs to the scheduler.
+
+        Schedulers that can accept many jobs in one request should override
+        this method. The default implementation calls `submit` for each job,
+        one after another. Callers may pass `fanout` > 1 to keep up to `fanout`
+        calls in flight, but only if `submit` of the client is thread-safe,
+        which is not the case for the local and Slurm clients. A failed
+        submission does not stop the others.
+
+        Args:
+            specs: A list of (worker_type, cmd) pairs, one for each job.
+            fanout: The maximum number of concurrent `submit` calls.
+                Defaults to 1, i.e., sequential submission.
+            kwargs: Scheduling arguments shared by all jobs.
+
+        Raises:
+            SchedulerError: If any of the submissions failed.
+        """
+        errors = []
+        if fanout <= 1 or len(specs) <= 1:
+            for worker_type, cmd in specs:
+                try:
+                    self.submit(worker_type, cmd, **kwargs)
+                except Exception as e:
+                    errors.append(f"{worker_type}: {e}")
+        else:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(fanout, len(specs))
+            ) as executor:
+                futures = {
+                    executor.submit(self.submit, worker_type, cmd, **kwargs): (
+                        worker_type
+                    )
+                    for worker_type, cmd in specs
+                }
+                for fut in concurrent.futures.as_completed(futures):
+                    if fut.exception() is not None:
+                        errors.append(f"{futures[fut]}: {fut.exception()}")
+        if len(errors) > 0:
+            raise SchedulerError(
+                f"Failed to submit {len(errors)}/{len(specs)} jobs:\n"
+                + "\n".join(errors)
+            )
+
     def submit_array(self, worker_type, cmd, count, **kwargs):
         """Submits an array of jobs to the scheduler.
 
@@ -67,12 +128,12 @@ class SchedulerClient:
             cmd: Command template of the jobs that may contain an "{index}" format placeholder.
             count: Number of jobs. The indices of the jobs shall be 0..count-1.
         """
-        for index in range(count):
-            self.submit(
-                worker_type + "_" + str(index),
-                cmd.format(index=index, count=count),
-                **kwargs,
-            )
+        format_cmd = _array_cmd_formatter(cmd, count)
+        prefix = worker_type + "_"
+        self.submit_batch(
+            [(f"{prefix}{index}", format_cmd(index)) for index in range(count)],
+            **kwargs,
+        )
 
     def stop(self, job_name):
         """Stops a running job.
@@ -101,55 +162,167 @@ class SchedulerClient:
         """Finds jobs.
 
         Args:
-            job_name_regex: job name regex.
+            job_name_regex: job name regex, either a string or a compiled
+                pattern. Implementations should match names with
+                `_make_matcher(job_name_regex)`.
 
         Returns:
             A list of found JobInfo.
         """
         raise NotImplementedError()
 
+    def find_all_columns(self, job_name_regex=".*") -> Dict[str, List]:
+        """Finds jobs like `find_all`, but returns one list per JobInfo field
+        instead of one JobInfo per job.
+
+        Returns:
+            A dict mapping each field name of JobInfo to a list of values,
+            where the i-th entries of all lists describe the same job.
+        """
+        infos = self.find_all(job_name_regex)
+        if len(infos) == 0:
+            return {field: [] for field in JobInfo._fields}
+        return dict(zip(JobInfo._fields, map(list, zip(*infos))))
+
     def wait(self, timeout=None, **kwargs):
         """Waits until all jobs submitted via this client instance finish."""
         raise NotImplementedError()
 
 
-def remote_worker_cmd(expr_name, trial_name, debug, worker_type):
-    # requires information in scheduler package
-    return (
-        f"python3 {'' if debug else '-O'} -m realhf.apps.remote worker -w {worker_type} "
-        f"-e {expr_name} -f {trial_name} -i {{jobstep_id}} -g {{n_jobsteps}} -r {{worker_submission_index}} "
-        f"-p {{wprocs_per_jobstep}} -j {{wprocs_in_job}} -o {{wproc_offset}}"
-    )
+class AsyncSchedulerClient:
+    """An asyncio facade of a SchedulerClient.
 
+    Each call runs the wrapped synchronous method in a worker thread, so
+    that scheduler round trips overlap with other coroutines instead of
+    blocking the event loop, e.g.,
 
-def setup_cmd(expr_name, trial_name, debug):
-    bash_cmd = (  # f"pip3 install -e $REAL_PACKAGE_PATH --no-build-isolation && "
-        f"python3 {'' if debug else '-O'} -m realhf.apps.remote "
-        f"reset_name_resolve -e {expr_name} -f {trial_name}"
-    )
-    # return f"bash -c \"{bash_cmd}\""
-    return bash_cmd
+        await asyncio.gather(
+            client.submit_array("model_worker", cmd, count=n),
+            other_coroutine(),
+        )
+
+    The wrapped clients keep unsynchronized state, so calls on the same
+    facade are serialized by an internal lock. To submit many jobs, use
+    `submit_batch` or `submit_array` rather than concurrent `submit` calls.
+    """
+
+    def __init__(self, sync: SchedulerClient):
+        self.sync = sync
+        # Acquired in the worker thread, such that a cancelled coroutine
+        # does not release it while its call is still running.
+        self._lock = threading.Lock()
+
+    def _call(self, method, *args, **kwargs):
+        with self._lock:
+            return method(*args, **kwargs)
+
+    async def _run(self, method, *args, **kwargs):
+        return await asyncio.to_thread(self._call, method, *args, **kwargs)
+
+    async def submit(self, worker_type, cmd, **kwargs):
+        return await self._run(self.sync.submit, worker_type, cmd, **kwargs)
+
+    async def submit_batch(self, specs: List[Tuple[str, str]], **kwargs):
+        return await self._run(self.sync.submit_batch, specs, **kwargs)
+
+    async def submit_array(self, worker_type, cmd, count, **kwargs):
+        return await self._run(
+            self.sync.submit_array, worker_type, cmd, count, **kwargs
+        )
 
+    async def stop(self, *args, **kwargs):
+        return await self._run(self.sync.stop, *args, **kwargs)
 
-def control_cmd(expr_name, trial_name, debug, ignore_worker_error, controller_type):
-    bash_cmd = (  # f"pip3 install -e $REAL_PACKAGE_PATH --no-build-isolation && "
-        f"python3 {'' if debug else '-O'} -m realhf.apps.remote controller "
-        f"-e {expr_name} -f {trial_name} "
-        f"--{'ignore_worker_error' if ignore_worker_error else 'raise_worker_error'} "
-        f"--type {controller_type}"
+    async def stop_all(self, signal=None):
+        return await self._run(self.sync.stop_all, signal)
+
+    async def find(self, job_name) -> Optional[JobInfo]:
+        return await self._run(self.sync.find, job_name)
+
+    async def find_all(self, job_name_regex=".*") -> List[JobInfo]:
+        return await self._run(self.sync.find_all, job_name_regex)
+
+    async def wait(self, timeout=None, **kwargs):
+        return await self._run(self.sync.wait, timeout, **kwargs)
+
+
+def _array_cmd_formatter(cmd: str, count: int) -> Callable[[int], str]:
+    """Returns a function equivalent to `lambda index: cmd.format(index=index,
+    count=count)`, but parses `cmd` only once."""
+    if "{" not in cmd and "}" not in cmd:
+        # Every job runs the same command.
+        return lambda index: cmd
+    parts = list(string.Formatter().parse(cmd))
+    # `parse` reports an empty spec for both "{index}" and "{index:}", so we
+    # check that `cmd` is rebuilt exactly from plain "{index}" and "{count}" fields.
+    plain = "".join(
+        literal.replace("{", "{{").replace("}", "}}")
+        + ("" if field is None else "{" + field + "}")
+        for literal, field, _, _ in parts
     )
-    # return f"bash -c \"{bash_cmd}\""
-    return bash_cmd
+    if plain != cmd or any(
+        field is not None and field not in ("index", "count")
+        for _, field, _, _ in parts
+    ):
+        # Format specs, conversions, or unknown fields. Let str.format handle them.
+        return lambda index: cmd.format(index=index, count=count)
+
+    count_str = str(count)
+    if not any("{" in literal or "}" in literal for literal, _, _, _ in parts):
+        # No escaped braces, so plain substitution is equivalent.
+        template = cmd.replace("{count}", count_str)
+        return lambda index: template.replace("{index}", str(index))
+
+    def format_cmd(index: int) -> str:
+        index_str = str(index)
+        return "".join(
+            literal
+            + ("" if field is None else count_str if field == "count" else index_str)
+            for literal, field, _, _ in parts
+        )
+
+    return format_cmd
+
+
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+def _make_matcher(job_name_regex: Union[str, re.Pattern]) -> Callable[[str], bool]:
+    """Returns a function equivalent to `lambda name:
+    re.fullmatch(job_name_regex, name) is not None`.
+
+    The common patterns ".*" and "<prefix>.*" are matched with plain
+    string operations instead of the regex engine.
+    """
+    if isinstance(job_name_regex, re.Pattern):
+        return lambda name: job_name_regex.fullmatch(name) is not None
+    if job_name_regex.endswith(".*"):
+        prefix = job_name_regex[:-2]
+        if not any(c in _REGEX_SPECIAL_CHARS for c in prefix):
+            # "." does not match newlines.
+            return lambda name: (
+                name.startswith(prefix) and "\n" not in name[len(prefix) :]
+            )
+    pattern = re.compile(job_name_regex)
+    return lambda name: pattern.fullmatch(name) is not None
 
 
-def make(mode, expr_name, trial_name, **kwargs) -> SchedulerClient:
-    if mode == "slurm":
-        from realhf.scheduler.slurm.client import SlurmSchedulerClient
+_SCHEDULER_CLIENT_CLASSES = {}
 
-        return SlurmSchedulerClient(expr_name, trial_name)
-    elif mode == "local":
-        from realhf.scheduler.local.client import LocalSchedulerClient
 
-        return LocalSchedulerClient(expr_name, trial_name)
-    else:
-        raise NotImplementedError(f"Scheduler {mode} not found")
+def make(mode, expr_name, trial_name, **kwargs) -> SchedulerClient:
+    # Backends are imported lazily and cached, since they pull in heavy
+    # dependencies (e.g., pandas for slurm, psutil for local).
+    if mode not in _SCHEDULER_CLIENT_CLASSES:
+        if mode == "slurm":
+            from realhf.scheduler.slurm.client import SlurmSchedulerClient as cls
+        elif mode == "local":
+            from realhf.scheduler.local.client import LocalSchedulerClient as cls
+        else:
+            raise NotImplementedError(f"Scheduler {mode} not found")
+        _SCHEDULER_CLIENT_CLASSES[mode] = cls
+    return _SCHEDULER_CLIENT_CLASSES[mode](expr_name, trial_name)
+
+
+def make_async(mode, expr_name, trial_name, **kwargs) -> AsyncSchedulerClient:
+    return AsyncSchedulerClient(make(mode, expr_name, trial_name, **kwargs))
@@ -0,0 +1,39 @@
+# Command builders of scheduled jobs. Keep this module free of heavy imports,
+# so that it is cheap to load in short-lived launcher processes.
+import functools
+
+
+@functools.lru_cache(maxsize=2)
+def _python_prefix(debug):
+    return f"python3 {'' if debug else '-O'} -m realhf.apps.remote"
+
+
+@functools.lru_cache(maxsize=128)
+def remote_worker_cmd(expr_name, trial_name, debug, worker_type):
+    # requires information in scheduler package
+    return (
+        f"{_python_prefix(debug)} worker -w {worker_type} "
+        f"-e {expr_name} -f {trial_name} -i {{jobstep_id}} -g {{n_jobsteps}} -r {{worker_submission_index}} "
+        f"-p {{wprocs_per_jobstep}} -j {{wprocs_in_job}} -o {{wproc_offset}}"
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def setup_cmd(expr_name, trial_name, debug):
+    bash_cmd = (  # f"pip3 install -e $REAL_PACKAGE_PATH --no-build-isolation && "
+        f"{_python_prefix(debug)} reset_name_resolve -e {expr_name} -f {trial_name}"
+    )
+    # return f"bash -c \"{bash_cmd}\""
+    return bash_cmd
+
+
+@functools.lru_cache(maxsize=128)
+def control_cmd(expr_name, trial_name, debug, ignore_worker_error, controller_type):
+    bash_cmd = (  # f"pip3 install -e $REAL_PACKAGE_PATH --no-build-isolation && "
+        f"{_python_prefix(debug)} controller "
+        f"-e {expr_name} -f {trial_name} "
+        f"--{'ignore_worker_error' if ignore_worker_error else 'raise_worker_error'} "
+        f"--type {controller_type}"
+    )
+    # return f"bash -c \"{bash_cmd}\""
+    return bash_cmd
@@ -1,5 +1,4 @@
 import os
-import re
 import signal as signal_module
 import subprocess
 import time
@@ -16,6 +15,7 @@ from realhf.scheduler.client import (
     JobState,
     SchedulerClient,
     SchedulerError,
+    _make_matcher,
 )
 
 logger = logging.getLogger("Local Scheduler")
@@ -139,6 +139,7 @@ class LocalSchedulerClient(SchedulerClient):
         self.submit_array(worker_type, cmd, count=1, **kwargs)
 
     def __commit_all(self):
+        debug = logger.isEnabledFor(logging.DEBUG)
         for worker_type, count, use_gpu, env_vars in zip(
             self._job_counter.keys(),
             self._job_counter.values(),
@@ -172,7 +173,8 @@ class LocalSchedulerClient(SchedulerClient):
                     wprocs_in_job=count,
                     wproc_offset=0,
                 )
-                logger.debug("Starting local process with command: %s", cmd)
+                if debug:
+                    logger.debug("Starting local process with command: %s", cmd)
                 cmd = f"{cmd} | tee -a {self.log_path_of(worker_type)}"
                 process = subprocess.Popen(cmd, shell=isinstance(cmd, str))
                 self._jobs[f"{worker_type}/{i}"] = process
@@ -207,9 +209,10 @@ class LocalSchedulerClient(SchedulerClient):
             return JobInfo(name=job_name, state=JobState.NOT_FOUND)
 
     def find_all(self, job_name_regex=".*"):
+        match = _make_matcher(job_name_regex)
         rs = []
         for name in self._jobs:
-            if re.fullmatch(job_name_regex, name):
+            if match(name):
                 rs.append(self.find(name))
         return rs
 
@@ -224,6 +227,8 @@ class LocalSchedulerClient(SchedulerClient):
         remove_status: Tuple[JobState, ...] = (JobState.COMPLETED,),
         update=False,
         commit=True,
+        poll_min: float = 0.2,
+        poll_max: float = 5.0,
     ):
         if commit:
             self.__commit_all()
@@ -236,7 +241,11 @@ class LocalSchedulerClient(SchedulerClient):
         left = set(self._jobs.keys())
         num_jobs_left = len(left)
 
+        # Poll with exponential backoff, restarting from `poll_min` whenever
+        # some job leaves the waiting set.
+        poll_interval = poll_min
         while len(left) > 0:
+            num_left_before_poll = len(left)
             to_remove = []
             if len(left) < num_jobs_left:
                 num_jobs_left = len(left)
@@ -283,4 +292,7 @@ class LocalSchedulerClient(SchedulerClient):
                         self._job_env_vars.pop(worker_type)
                         self._job_cmd.pop(worker_type)
 
-            time.sleep(2)
+            if len(left) < num_left_before_poll:
+                poll_interval = poll_min
+            time.sleep(poll_interval)
+            poll_interval = min(poll_max, poll_interval * 2)
@@ -1,5 +1,4 @@
 import fcntl
-import re
 import subprocess
 import time
 from collections import defaultdict
@@ -8,18 +7,28 @@ from typing import Dict, List, Literal, Optional, Tuple
 import realhf.base.logging as logging
 from realhf.base.cluster import spec as cluster_spec
 from realhf.base.constants import SLURM_LOCK_FILE_NAME as LOCK_FILE_NAME
-from realhf.scheduler.client import JobException, JobInfo, JobState, SchedulerClient
+from realhf.scheduler.client import (
+    JobException,
+    JobInfo,
+    JobState,
+    SchedulerClient,
+    _make_matcher,
+)
 from realhf.scheduler.slurm.utils import (
     SlurmLaunchInfo,
     SlurmResource,
     SlurmResourceNotEnoughException,
     allocate_resources,
+    query_latest_jobs,
 )
 
 logger = logging.getLogger("Slurm-scheduler")
 
 SCHEDULING_RETRY_INTERVAL_SECONDS = 30
 SCHEDULING_TIMEOUT_MAX_SECONDS = 3600 * 24
+# Job states queried from Slurm are reused for this long, so that
+# back-to-back find_all/wait polls issue at most one query.
+JOB_INFO_CACHE_TTL_SECONDS = 0.5
 
 
 class SlurmSchedulerClient(SchedulerClient):
@@ -34,6 +43,8 @@ class SlurmSchedulerClient(SchedulerClient):
         self.__submission_counter = defaultdict(int)
         self.__wprocs_counter = defaultdict(int)
 
+        self.__last_update_time = None
+
     def submit(self, worker_type, cmd, **kwargs):
         self.submit_array(worker_type, cmd, count=1, **kwargs)
 
@@ -149,6 +160,7 @@ class SlurmSchedulerClient(SchedulerClient):
                 launch_info.commit()
                 self.__committed_jobs[slurm_name] = launch_info
             self.__pending_jobs = dict()
+            self.__last_update_time = None
             states = [None for _ in self.__committed_jobs]
             while JobState.PENDING in states or None in states:
                 time.sleep(0.1)
@@ -165,11 +177,13 @@ class SlurmSchedulerClient(SchedulerClient):
         launch_info = self.__committed_jobs.get(slurm_name, None)
         if launch_info:
             launch_info.cancel()
+            self.__last_update_time = None
 
     def stop_all(self, signal: Literal["SIGINT", "SIGKILL"] = "SIGKILL"):
         for launch_info in self.__committed_jobs.values():
             logger.info(f"Canceling job {launch_info.slurm_name}")
             launch_info.cancel(signal)
+        self.__last_update_time = None
         time.sleep(0.2)
         self.wait(
             check_status=(),
@@ -190,11 +204,12 @@ class SlurmSchedulerClient(SchedulerClient):
 
     def find_all(self, job_name_regex: str = ".*") -> List[JobInfo]:
         self.__update_all()
+        match = _make_matcher(job_name_regex)
         infos = []
         for r in self.__committed_jobs.values():
             if r.job_info is None:
                 continue
-            if re.fullmatch(job_name_regex, r.slurm_name):
+            if match(r.slurm_name):
                 infos.append(r.job_info)
         return infos
 
@@ -208,6 +223,8 @@ class SlurmSchedulerClient(SchedulerClient):
         ),
         remove_status: Tuple[JobState, ...] = (JobState.COMPLETED,),
         update=False,
+        poll_min: float = 0.2,
+        poll_max: float = 5.0,
     ):
         # before wait, commit all remaining pending jobs
         # TODO: grab global file lock to avoid multi-experiment deadlocks
@@ -220,7 +237,11 @@ class SlurmSchedulerClient(SchedulerClient):
             f"Waiting for {num_jobs_left} jobs. Jobs IDs: "
             f"{','.join(sorted([x.job_info.slurm_id for x in self.__committed_jobs.values()]))}."
         )
+        # Poll with exponential backoff, restarting from `poll_min` whenever
+        # some job leaves the waiting set.
+        poll_interval = poll_min
         while len(left) > 0:
+            num_left_before_poll = len(left)
             if len(left) < num_jobs_left:
                 num_jobs_left = len(left)
                 logger.info(f"Waiting for {num_jobs_left} jobs.")
@@ -255,11 +276,28 @@ class SlurmSchedulerClient(SchedulerClient):
                     left.remove(job_slurm_name)
                     if update:
                         self.__committed_jobs.pop(job_slurm_name)
-            time.sleep(2)
+            if len(left) < num_left_before_poll:
+                poll_interval = poll_min
+            time.sleep(poll_interval)
+            poll_interval = min(poll_max, poll_interval * 2)
 
     def __update_all(self):
+        now = time.monotonic()
+        if (
+            self.__last_update_time is not None
+            and now - self.__last_update_time < JOB_INFO_CACHE_TTL_SECONDS
+        ):
+            return [
+                None if launch_info.job_info is None else launch_info.job_info.state
+                for launch_info in self.__committed_jobs.values()
+            ]
+        # Query all committed jobs with a single squeue call.
+        job_infos = query_latest_jobs(list(self.__committed_jobs.keys()))
         states = []
-        for launch_info in self.__committed_jobs.values():
-            state = launch_info.update()
-            states.append(state)
+        for slurm_name, launch_info in self.__committed_jobs.items():
+            launch_info.job_info = job_infos.get(slurm_name)
+            states.append(
+                None if launch_info.job_info is None else launch_info.job_info.state
+            )
+        self.__last_update_time = now
         return states
@@ -11,6 +11,7 @@ import os
 import shutil
 import socket
 import subprocess
+import sys
 from typing import Callable, Dict, List, Literal, Optional, Union
 
 import pandas as pd
@@ -38,9 +39,22 @@ SQUEUE_FIELDS = [
 STATUS_MAPPING = {
     "RUNNING": JobState.RUNNING,
     "COMPLETING": JobState.RUNNING,
+    "SIGNALING": JobState.RUNNING,
+    "STAGE_OUT": JobState.RUNNING,
+    "RESIZING": JobState.RUNNING,
     "PENDING": JobState.PENDING,
+    "CONFIGURING": JobState.PENDING,
+    "REQUEUED": JobState.PENDING,
+    "REQUEUE_HOLD": JobState.PENDING,
+    # Suspended and stopped jobs have been started and may be resumed at any time.
+    # Do not treat them as pending, otherwise committing jobs waits on them forever.
+    "SUSPENDED": JobState.RUNNING,
+    "STOPPED": JobState.RUNNING,
     "CANCELLED": JobState.CANCELLED,
     "FAILED": JobState.FAILED,
+    "BOOT_FAIL": JobState.FAILED,
+    "NODE_FAIL": JobState.FAILED,
+    "PREEMPTED": JobState.FAILED,
     "COMPLETED": JobState.COMPLETED,
     "OUT_OF_MEMORY": JobState.FAILED,
     "DEADLINE": JobState.COMPLETED,
@@ -320,13 +334,7 @@ class SlurmLaunchInfo:
         )
 
     def update(self):
-        job_infos = query_jobs(slurm_names=[self.slurm_name])
-        job_infos = sorted(
-            job_infos,
-            key=lambda x: parse_formatted_time(x.submit_time),
-            reverse=True,
-        )
-        self.job_info = job_infos[0] if len(job_infos) > 0 else None
+        self.job_info = query_latest_jobs([self.slurm_name]).get(self.slurm_name)
         if self.job_info:
             return self.job_info.state
         else:
@@ -347,7 +355,7 @@ class SlurmLaunchInfo:
             job_info_str = "None"
         else:
             job_info_str = "\n".join(
-                [f"{k}: {v}" for k, v in self.job_info.__dict__.items()]
+                [f"{k}: {v}" for k, v in self.job_info._asdict().items()]
             )
         s += f"Runtime JobInfo: [\n{job_info_str}\n]\n"
         env_var_str = "\n".join([f"{k}: {v}" for k, v in self.env_vars.items()])
@@ -485,6 +493,15 @@ def unparse_formatted_time(timestamp: int) -> str:
     return d.strftime("%Y-%m-%dT%H:%M:%S")
 
 
+def _parse_job_state(state: str, slurm_name: str) -> JobState:
+    if state not in STATUS_MAPPING:
+        logger.warning(
+            f"Unknown Slurm state {state} of job {slurm_name}, treated as NOT_FOUND."
+        )
+        return JobState.NOT_FOUND
+    return STATUS_MAPPING[state]
+
+
 # slurm command execute and output parsing
 def query_jobs(
     slurm_names: Optional[List[str]] = None,
@@ -509,8 +526,9 @@ def query_jobs(
         rs.append(
             JobInfo(
                 name=slurm_name,
-                state=STATUS_MAPPING[state],
-                host=nodelist,
+                state=_parse_job_state(state, slurm_name),
+                # Many jobs share few hosts, so intern the names.
+                host=sys.intern(nodelist),
                 submit_time=submit_time,
                 start_time=start_time,
                 slurm_id=job_id.strip(),
@@ -519,6 +537,25 @@ def query_jobs(
     return rs
 
 
+def query_latest_jobs(slurm_names: List[str]) -> Dict[str, JobInfo]:
+    """Queries the given job names with a single squeue call.
+
+    Returns:
+        The most recently submitted job of each name. Names without any
+        job are not included.
+    """
+    latest: Dict[str, JobInfo] = {}
+    if len(slurm_names) == 0:
+        return latest
+    for job_info in query_jobs(slurm_names=slurm_names):
+        prev = latest.get(job_info.name)
+        if prev is None or parse_formatted_time(
+            job_info.submit_time
+        ) > parse_formatted_time(prev.submit_time):
+            latest[job_info.name] = job_info
+    return latest
+
+
 def cancel_jobs(
     slurm_names: Optional[List[str]] = None,
     slurm_ids: Optional[List[str]] = None,
@@ -5,7 +5,6 @@ import itertools
 import multiprocessing as mp
 import os
 import pickle
-import queue
 import socket
 import time
 import uuid
@@ -61,6 +60,13 @@ TIME_RECORD_RPCS = [
     "initialize",
 ]
 
+MAX_REPLIES_PER_POLL = 64
+# Returned by idle polls. PollResult is only read by the worker loop,
+# so the same instance can be shared.
+_EMPTY_POLL_RESULT = worker_base.PollResult(sample_count=0, batch_count=0)
+# The maximum time in seconds spent draining incoming requests in one poll.
+RECEIVE_REQUESTS_TIME_BUDGET = 1e-3
+
 
 def get_pytorch_profiler(with_stack: bool, enabled: bool = True):
     if enabled:
@@ -78,6 +84,19 @@ def get_pytorch_profiler(with_stack: bool, enabled: bool = True):
         return contextlib.nullcontext()
 
 
+# Flush the CUDA cache only if the cached but unused memory exceeds
+# both this size and the allocated memory.
+CUDA_CACHE_FLUSH_MIN_BYTES = 1024**3
+
+
+def _cuda_cache_is_fragmented() -> bool:
+    if not torch.cuda.is_initialized():
+        return False
+    allocated = torch.cuda.memory_allocated()
+    unused = torch.cuda.memory_reserved() - allocated
+    return unused > max(allocated, CUDA_CACHE_FLUSH_MIN_BYTES)
+
+
 class NoRequestToHandle(Exception):
     pass
 
@@ -188,6 +207,9 @@ class ModelWorker(worker_base.Worker):
         self.__dataset_dp_size = self.__dataset_dp_rank = 0
         sub_patterns = [s.id for s in self.config.shards]
         src_rpc = [rpc for rpc in self.config.model_rpcs if rpc.is_src][0]
+        self.__rpcs: Dict[str, dfg.MFCDef] = {
+            rpc.name: rpc for rpc in self.config.model_rpcs
+        }
         self.__src_rpc_model_name = src_rpc.model_name
         for s in self.config.shards:
             _pp_size = s.id.topo.get_dim("pipe")
@@ -282,6 +304,7 @@ class ModelWorker(worker_base.Worker):
             self.__dataset_n_seqs = 0
             for tmp_sample in self.__dataloader:
                 self.__dataset_n_seqs += tmp_sample.bs
+            self.__dataset_n_batches = len(self.__dataloader)
 
             self.__data_generator = enumerate(self.__dataloader)
             self.__dataset_batch_counter = None
@@ -368,8 +391,12 @@ class ModelWorker(worker_base.Worker):
         self.__request_cache = {}
         self.__ack_cache = {}
 
-        self.__request_queue = queue.Queue(maxsize=8)
-        self.__reply_queue = queue.Queue(maxsize=8)
+        self.__model_dp_ranks: Dict[ModelName, int] = {}
+
+        # These queues are only accessed by the polling thread,
+        # so we use deques instead of the locked queue.Queue.
+        self.__request_queue = collections.deque()
+        self.__reply_queue = collections.deque()
         self.__request_sample_size = dict()
 
         # Storing data loaded from the dataset and outputs of the
@@ -390,14 +417,16 @@ class ModelWorker(worker_base.Worker):
 
         self.__compute_input_queues = {
             model_name: dict(
-                train_step=queue.Queue(4),
-                inference=queue.Queue(4),
-                generate=queue.Queue(4),
-                evaluate=queue.Queue(4),
+                train_step=collections.deque(),
+                inference=collections.deque(),
+                generate=collections.deque(),
+                evaluate=collections.deque(),
             )
             for model_name in self.__models.keys()
         }
 
+        data_transfer_comm.warmup_data_transfer(self.__data_transfer_info)
+
     def prefetch_from_dataset(self):
         if self.__cur_sample is None:
             try:
@@ -414,6 +443,13 @@ class ModelWorker(worker_base.Worker):
                 self.__dataset_batch_counter, self.__cur_sample = next(
                     self.__data_generator
                 )
+            # Pin the loaded data, such that copying it to GPU
+            # during data transfer does not block the CPU.
+            if self.__cur_sample.data is not None and torch.cuda.is_available():
+                self.__cur_sample.data = {
+                    k: v.pin_memory() if v is not None and not v.is_cuda else v
+                    for k, v in self.__cur_sample.data.items()
+                }
 
     def __handle_one_rpc_hook(self, hook: str, hook_data: Any):
         tik = time.perf_counter()
@@ -481,26 +517,17 @@ class ModelWorker(worker_base.Worker):
         )
 
     def handle_all_pre_hooks(self):
-        # drain request queues, handle all pending hooks, then recover the queue
-        cache = []
-        while True:
-            try:
-                request, data, handled, res = self.__request_queue.get_nowait()
-                request: request_reply_stream.Payload
-                if not handled:
-                    while len(request.pre_hooks) > 0:
-                        assert len(request.pre_hooks) == len(request.pre_hook_data)
-                        assert not handled and res is None
-                        self.__handle_one_rpc_hook(
-                            request.pre_hooks.pop(0),
-                            request.pre_hook_data.pop(0),
-                        )
-                cache.append((request, data, handled, res))
-            except queue.Empty:
-                break
-
-        for c in cache:
-            self.__request_queue.put_nowait(c)
+        # handle all pending hooks of the queued requests in order
+        for request, data, handled, res in self.__request_queue:
+            request: request_reply_stream.Payload
+            if not handled:
+                while len(request.pre_hooks) > 0:
+                    assert len(request.pre_hooks) == len(request.pre_hook_data)
+                    assert not handled and res is None
+                    self.__handle_one_rpc_hook(
+                        request.pre_hooks.pop(0),
+                        request.pre_hook_data.pop(0),
+                    )
 
     def model_poll_step(
         self,
@@ -583,7 +610,11 @@ class ModelWorker(worker_base.Worker):
                         data_loaded.append(x)
 
                 if len(data_loaded) > 0:
-                    meta_sample = data_api.SequenceSample.gather(data_loaded).meta()
+                    # Gather the metadata only. Gathering the data would
+                    # concatenate all tensors just to drop them afterwards.
+                    meta_sample = data_api.SequenceSample.gather(
+                        [x.meta() for x in data_loaded]
+                    )
                 else:
                     meta_sample = None
                 res = data_api.DataBatchMeta(
@@ -591,7 +622,7 @@ class ModelWorker(worker_base.Worker):
                     meta_sample=meta_sample,
                     epoch=self.__dataset_epoch,
                     is_final_batch=(
-                        self.__dataset_batch_counter == len(self.__dataloader) - 1
+                        self.__dataset_batch_counter == self.__dataset_n_batches - 1
                     ),
                 )
                 self.__cur_sample = None
@@ -607,15 +638,17 @@ class ModelWorker(worker_base.Worker):
                             del self.__data_sent_worker_indices[_id]
                         if _id in self.__data_received_worker_indices:
                             del self.__data_received_worker_indices[_id]
-                    gc.collect()
+                    # Tensors are freed by reference counting once deleted above.
+                    # Flushing the CUDA cache is expensive, so we only do it when
+                    # a significant amount of reserved memory is not in use.
                     if (
                         self.config.cuda_cache_cleanliness
                         and self.__clear_cache_frequency.check()
+                        and _cuda_cache_is_fragmented()
                     ):
                         st = time.monotonic()
                         gc.collect()
                         torch.cuda.empty_cache()
-                        gc.collect()
                         et = time.monotonic()
                         blogger.debug(
                             f"Model worker {self.__worker_index} cleared cache in {et-st:.4f}s"
@@ -656,7 +689,7 @@ class ModelWorker(worker_base.Worker):
             for hook, hook_data in zip(request.post_hooks, request.post_hook_data):
                 self.__handle_one_rpc_hook(hook, hook_data)
 
-        self.__reply_queue.put_nowait((request, res))
+        self.__reply_queue.append((request, res))
         sample_count = data.bs if isinstance(data, data_api.SequenceSample) else 1
         self.__request_sample_size[request.request_id] = sample_count
 
@@ -731,11 +764,9 @@ class ModelWorker(worker_base.Worker):
         input_queue = self.__compute_input_queues[request.handler.model_name][
             request.handle_name
         ]
-        rpc: dfg.MFCDef = next(
-            rpc for rpc in self.config.model_rpcs if rpc.name == request.data
-        )
+        rpc: dfg.MFCDef = self.__rpcs[request.data]
 
-        data: data_api.SequenceSample = input_queue.get_nowait()
+        data: data_api.SequenceSample = input_queue.popleft()
 
         if self.config.profile_mode:
             data = self._interface.mock(request.handle_name, self._model, data)
@@ -793,34 +824,40 @@ class ModelWorker(worker_base.Worker):
 
         data_transfer_comm.run_data_transfer(
             comm_plan=comm_plan,
-            meta_samples={x.ids[0]: x for x in meta_sample.unpack()},
+            meta_sample=meta_sample,
             storage=self.__data_storage,
             sent_worker_idx_table=self.__data_sent_worker_indices,
             received_worker_idx_table=self.__data_received_worker_indices,
         )
 
         if hook_data["target"] in self.__models:
-            with constants.model_scope(hook_data["target"]):
-                local_ids = [
-                    meta_sample.ids[i]
-                    for i in hook_data["target_mapping"][self._dp_rank]
+            # The DP rank is fixed after setup, so only enter the scope once.
+            if hook_data["target"] not in self.__model_dp_ranks:
+                with constants.model_scope(hook_data["target"]):
+                    self.__model_dp_ranks[hook_data["target"]] = self._dp_rank
+            local_ids = [
+                meta_sample.ids[i]
+                for i in hook_data["target_mapping"][
+                    self.__model_dp_ranks[hook_data["target"]]
                 ]
+            ]
             r = data_api.SequenceSample.gather(
                 [self.__data_storage[_id] for _id in local_ids],
                 keys=meta_sample.keys,
             )
             self.__compute_input_queues[hook_data["target"]][
                 hook_data["handle_name"]
-            ].put_nowait(r)
+            ].append(r)
 
     @cuda_tmark("post_response", CUDATimeMarkType.misc)
     def maybe_post_responses(self):
+        # Post all ready replies at once, but at most MAX_REPLIES_PER_POLL,
+        # such that a long queue does not delay handling new requests.
+        if len(self.__reply_queue) == 0:
+            return _EMPTY_POLL_RESULT
         ready_to_post = []
-        try:
-            request, res = self.__reply_queue.get_nowait()
-            ready_to_post.append((request, res))
-        except queue.Empty:
-            pass
+        while len(self.__reply_queue) > 0 and len(ready_to_post) < MAX_REPLIES_PER_POLL:
+            ready_to_post.append(self.__reply_queue.popleft())
 
         batch_size = sample_size = 0
         for request, res in ready_to_post:
@@ -840,32 +877,40 @@ class ModelWorker(worker_base.Worker):
             batch_size += 1
         return worker_base.PollResult(sample_count=sample_size, batch_count=batch_size)
 
-    def __maybe_receive_one_request(self):
-        try:
-            r: request_reply_stream.Payload = self.__stream.poll()
+    @cuda_tmark("receive_request", CUDATimeMarkType.misc)
+    def maybe_receive_requests(self):
+        # Drain the incoming messages until there is none left,
+        # but for at most RECEIVE_REQUESTS_TIME_BUDGET seconds.
+        syns = []
+        deadline = time.monotonic() + RECEIVE_REQUESTS_TIME_BUDGET
+        while time.monotonic() < deadline:
+            try:
+                r: request_reply_stream.Payload = self.__stream.poll()
+            except request_reply_stream.NoMessage:
+                break
             if r.handle_name == "ack":
                 self.__ack_cache[r.request_id] = r
             else:
-                self.__stream.post(
+                syns.append(
                     request_reply_stream.Payload(
                         handler="master",
                         request_id=r.syn_reply_id,
                         handle_name="syn",
-                    ),
+                    )
                 )
                 self.__request_cache[r.ack_reply_id] = r
-        except request_reply_stream.NoMessage:
-            return
+        # Post syn replies after draining, such that they are sent back to back.
+        for syn in syns:
+            self.__stream.post(syn)
 
-    @cuda_tmark("receive_request", CUDATimeMarkType.misc)
-    def maybe_receive_requests(self):
-        self.__maybe_receive_one_request()
-        cur_ack_ids = list(self.__ack_cache.keys())
-        for ack_id in cur_ack_ids:
-            if ack_id in self.__request_cache:
-                self.__ack_cache.pop(ack_id)
-                req = self.__request_cache.pop(ack_id)
-                self.__request_queue.put_nowait((req, req.data, False, None))
+        if len(self.__ack_cache) == 0 or len(self.__request_cache) == 0:
+            return
+        # Keep the order in which acks arrived, which is the same on all workers.
+        ready_ack_ids = [i for i in self.__ack_cache if i in self.__request_cache]
+        for ack_id in ready_ack_ids:
+            self.__ack_cache.pop(ack_id)
+            req = self.__request_cache.pop(ack_id)
+            self.__request_queue.append((req, req.data, False, None))
 
     def _poll(self):
         if not self.__dist_env_resolved:
@@ -882,11 +927,10 @@ class ModelWorker(worker_base.Worker):
         self.maybe_receive_requests()
 
         # Prioritize the reset request.
-        for _ in range(self.__request_queue.qsize()):
-            request, data, handled, res = self.__request_queue.get_nowait()
+        for i, (request, *_) in enumerate(self.__request_queue):
             if request.handle_name == "reset":
+                del self.__request_queue[i]
                 return self.__experiment_complete_exit()
-            self.__request_queue.put_nowait((request, data, handled, res))
 
         # NOTE: We ensure that all model workers have the same set of requests
         # at any time through a TCP-like protocol, i.e., req -> ack -> syn -> resp.
@@ -898,11 +942,9 @@ class ModelWorker(worker_base.Worker):
 
         # Execute one MFC them immediately return the result, such that
         # we can correctly log the time consumption in the master worker.
-        try:
-            request, data, handled, res = self.__request_queue.get_nowait()
+        if len(self.__request_queue) > 0:
+            request, data, handled, res = self.__request_queue.popleft()
             self.model_poll_step(request, data, handled, res)
-        except queue.Empty:
-            pass
 
         r = self.maybe_post_responses()
         return r
@@ -948,7 +990,7 @@ class ModelWorker(worker_base.Worker):
         except pynvml.nvml.NVMLError_Uninitialized:
             pass
         self.pause()
-        return worker_base.PollResult(sample_count=0, batch_count=0)
+        return _EMPTY_POLL_RESULT
 
     def __recover_save(self):
         # store model and dataset states for recover
@@ -27,6 +27,17 @@ _MAX_SOCKET_CONCURRENCY = 1000
 WORKER_WAIT_FOR_CONTROLLER_SECONDS = 3600
 WORKER_JOB_STATUS_LINGER_SECONDS = 60
 
+# Worker loggers indexed by (worker_type, logger type). `logging.getLogger`
+# resets the global logging config, so call it once per worker type.
+_WORKER_LOGGERS = {}
+
+
+def _get_worker_logger(worker_type: str, type_: str = "colored"):
+    key = (worker_type, type_)
+    if key not in _WORKER_LOGGERS:
+        _WORKER_LOGGERS[key] = logging.getLogger(worker_type + "-worker", type_)
+    return _WORKER_LOGGERS[key]
+
 
 class WorkerException(Exception):
 
@@ -110,6 +121,11 @@ class WorkerServer:
         self.__trial_name = trial_name
 
         self.__task_queue = task_queue
+        self.__status_key = names.worker_status(
+            experiment_name=experiment_name,
+            trial_name=trial_name,
+            worker_name=worker_name,
+        )
 
         self.__handlers = {}
         host_ip = socket.gethostbyname(socket.gethostname())
@@ -156,17 +172,21 @@ class WorkerServer:
             The count of requests handled.
         """
         count = 0
+        debug = logger.isEnabledFor(logging.DEBUG)
         while max_count is None or count < max_count:
             try:
                 command, kwargs = self.__task_queue.try_get_request()
             except NoRequstForWorker:
                 # Currently no request in the queue.
                 break
-            logger.debug("Handle request %s with kwargs %s", command, kwargs)
-            if command in self.__handlers:
+            if debug:
+                logger.debug("Handle request %s with kwargs %s", command, kwargs)
+            handler = self.__handlers.get(command)
+            if handler is not None:
                 try:
-                    response = self.__handlers[command](**kwargs)
-                    logger.debug("Handle request: %s, ok", command)
+                    response = handler(**kwargs)
+                    if debug:
+                        logger.debug("Handle request: %s, ok", command)
                 except WorkerException:
                     raise
                 except Exception as e:
@@ -177,18 +197,15 @@ class WorkerServer:
                 logger.error("Handle request: %s, no such command", command)
                 response = KeyError(f"No such command: {command}")
             self.__task_queue.respond(response)
-            logger.debug("Handle request: %s, sent reply", command)
+            if debug:
+                logger.debug("Handle request: %s, sent reply", command)
             count += 1
         return count
 
     def set_status(self, status: WorkerServerStatus):
         """On graceful exit, worker status is cleared."""
-        name_resolve.add(
-            names.worker_status(
-                experiment_name=self.__experiment_name,
-                trial_name=self.__trial_name,
-                worker_name=self.__worker_name,
-            ),
+        name_resolve.add_async(
+            self.__status_key,
             value=status.value,
             keepalive_ttl=WORKER_JOB_STATUS_LINGER_SECONDS,  # Job Status lives one minutes after worker exit.
             replace=True,
@@ -213,6 +230,11 @@ class WorkerControlPanelRequester:
     ) -> Future:
         raise NotImplementedError()
 
+    def send_oneway(self, worker_name: str, address: str, command: str, **kwargs):
+        """Sends a request without waiting for, or keeping track of, the
+        response."""
+        self.async_request(worker_name, address, command, False, **kwargs)
+
 
 class WorkerControlPanel:
     """A class that defines the management utilities to all the workers of an
@@ -235,6 +257,7 @@ class WorkerControlPanel:
         self.__experiment_name = experiment_name
         self.__trial_name = trial_name
         self.__worker_addresses = {}
+        self.__worker_status_keys = {}
 
         self.__requester = requester
 
@@ -329,6 +352,12 @@ class WorkerControlPanel:
                 continue
             # self.__worker_addresses[name] stores address
             self.__worker_addresses[name] = server_address
+            if name not in self.__worker_status_keys:
+                self.__worker_status_keys[name] = names.worker_status(
+                    experiment_name=self.__experiment_name,
+                    trial_name=self.__trial_name,
+                    worker_name=name,
+                )
             rs.append(name)
         return rs
 
@@ -394,6 +423,13 @@ class WorkerControlPanel:
         else:
             worker_kwargs = [kwargs for _ in selected]
 
+        if not wait_response:
+            for name, kwargs in zip(selected, worker_kwargs):
+                self.__requester.send_oneway(
+                    name, self.__worker_addresses[name], command, **kwargs
+                )
+            return []
+
         # connect _MAX_SOCKET_CONCURRENCY sockets at most
         rs = []
         deadline = time.monotonic() + (timeout or 0)
@@ -410,9 +446,6 @@ class WorkerControlPanel:
                     WorkerControlPanel.Response(worker_name=name, result=result_fut)
                 )
 
-            if not wait_response:
-                continue
-
             bar = range(len(sub_rs))
             if progress:
                 try:
@@ -437,14 +470,11 @@ class WorkerControlPanel:
         Raises:
             ValueError if worker is not connected.
         """
+        if worker_name not in self.__worker_status_keys:
+            raise ValueError(f"Worker {worker_name} is not connected.")
         try:
             status_str = name_resolve.wait(
-                names.worker_status(
-                    experiment_name=self.__experiment_name,
-                    trial_name=self.__trial_name,
-                    worker_name=worker_name,
-                ),
-                timeout=60,
+                self.__worker_status_keys[worker_name], timeout=60
             )
             status = WorkerServerStatus(status_str)
         except name_resolve.NameEntryNotFoundError:
@@ -549,7 +579,7 @@ class Worker:
         self.__worker_info = r
         self.__worker_type = r.worker_type
         self.__worker_index = r.worker_index
-        self.logger = logging.getLogger(r.worker_type + "-worker", "colored")
+        self.logger = _get_worker_logger(r.worker_type)
         if r.host_key is not None:
             self.__host_key(
                 names.worker_key(
@@ -601,12 +631,14 @@ class Worker:
         self.logger.info("Exiting worker")
         self._exit_hook(WorkerServerStatus.COMPLETED)
         self.__set_status(WorkerServerStatus.COMPLETED)
+        name_resolve.flush()
         self.__exiting = True
 
     def interrupt(self):
         self.logger.info("Worker interrupted by remote control.")
         self._exit_hook(WorkerServerStatus.INTERRUPTED)
         self.__set_status(WorkerServerStatus.INTERRUPTED)
+        name_resolve.flush()
         raise WorkerException(
             worker_name="worker",
             worker_status=WorkerServerStatus.INTERRUPTED,
@@ -655,11 +687,14 @@ class Worker:
                 raise e
             self.__set_status(WorkerServerStatus.ERROR)
             self._exit_hook(WorkerServerStatus.ERROR)
+            name_resolve.flush()
             raise e
 
     def __host_key(self, key: str):
         self.logger.info(f"Hosting key: {key}")
-        name_resolve.add(key, "up", keepalive_ttl=15, replace=True, delete_on_exit=True)
+        name_resolve.add_async(
+            key, "up", keepalive_ttl=15, replace=True, delete_on_exit=True
+        )
 
     def __watch_keys(self, keys: List[str]):
         self.logger.info(f"Watching keys: {keys}")
@@ -680,6 +715,7 @@ class MappingThread:
         upstream_queue,
         downstream_queue: queue.Queue = None,
         cuda_device=None,
+        max_drain_size: int = 16,
     ):
         """Init method of MappingThread for Policy Workers.
 
@@ -688,13 +724,16 @@ class MappingThread:
             interrupt_flag: main thread sets this value to True to interrupt the thread.
             upstream_queue: the queue to get data from.
             downstream_queue: the queue to put data after processing. If None, data will be discarded after processing.
+            max_drain_size: the maximum number of items taken from upstream_queue per wakeup.
         """
         self.__map_fn = map_fn
         self.__interrupt = interrupt_flag
         self.__upstream_queue = upstream_queue
         self.__downstream_queue = downstream_queue
+        self.__max_drain_size = max_drain_size
         self.__thread = threading.Thread(target=self._run, daemon=True)
         self.__cuda_device = cuda_device
+        self.__cuda_stream = None
 
     def is_alive(self) -> bool:
         """Check whether the thread is alive.
@@ -713,19 +752,40 @@ class MappingThread:
         self.__thread.join()
 
     def _run(self):
-        if self.__cuda_device is not None:
-            set_cuda_device(self.__cuda_device)
-        while not self.__interrupt:
-            self._run_step()
+        if self.__cuda_device is None or self.__cuda_device == "cpu":
+            while not self.__interrupt:
+                self._run_step()
+            return
+
+        import torch
+
+        set_cuda_device(self.__cuda_device)
+        # Map on a side stream so that copies issued by map_fn overlap
+        # with the computation launched by the main thread.
+        self.__cuda_stream = torch.cuda.Stream(device=self.__cuda_device)
+        with torch.cuda.stream(self.__cuda_stream):
+            while not self.__interrupt:
+                self._run_step()
 
     def _run_step(self):
         try:
-            data = self.__upstream_queue.get(timeout=1)
-            data = self.__map_fn(data)
-            if self.__downstream_queue is not None:
-                self.__downstream_queue.put(data)
+            batch = [self.__upstream_queue.get(timeout=1)]
         except queue.Empty:
-            pass
+            return
+        # Drain whatever is already queued so that a burst of items
+        # costs a single blocking wakeup instead of one per item.
+        while len(batch) < self.__max_drain_size:
+            try:
+                batch.append(self.__upstream_queue.get_nowait())
+            except queue.Empty:
+                break
+        batch = [self.__map_fn(data) for data in batch]
+        if self.__cuda_stream is not None:
+            # Consumers use their own streams. Make sure the results are ready.
+            self.__cuda_stream.synchronize()
+        if self.__downstream_queue is not None:
+            for data in batch:
+                self.__downstream_queue.put(data)
 
     def stop(self):
         """Stop the wrapped thread."""
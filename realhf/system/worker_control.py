@@ -114,6 +114,13 @@ class ZmqRequester(worker_base.WorkerControlPanelRequester):
             wait_response=wait_response,
         )
 
+    def send_oneway(self, worker_name, address, command, **kwargs):
+        sock = self.__context.socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.connect(f"tcp://{address}")
+        sock.send(pickle.dumps((command, kwargs)), flags=zmq.NOBLOCK)
+        sock.close()
+
 
 class RayRequester(worker_base.WorkerControlPanelRequester):
 
@@ -149,6 +156,9 @@ class RayRequester(worker_base.WorkerControlPanelRequester):
         reply_queue = self.__reply_comms[worker_name]
         return self.RayQueueFuture(worker_name, reply_queue)
 
+    def send_oneway(self, worker_name, _, command, **kwargs):
+        self.__request_comms[worker_name].put((command, kwargs))
+
 
 def make_server(type_, worker_name, experiment_name, trial_name, **kwargs):
     if type_ == "zmq":
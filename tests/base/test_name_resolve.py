@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from realhf.base import name_resolve
+
+
+class _CountingRepository(name_resolve.MemoryNameRecordRepository):
+
+    def __init__(self):
+        super().__init__()
+        self.n_adds = 0
+
+    def add(self, name, value, **kwargs):
+        self.n_adds += 1
+        super().add(name, value, **kwargs)
+
+
+@pytest.fixture
+def repo():
+    repo = _CountingRepository()
+    # Long enough for all writes issued in a test to be collected in one burst.
+    repo.ASYNC_COALESCE_SECONDS = 0.1
+    yield repo
+    repo.reset()
+
+
+def test_add_async_coalesce(repo):
+    for i in range(100):
+        repo.add_async("a", str(i), replace=True)
+    repo.add_async("b", "b")
+    repo.flush()
+    assert repo.get("a") == "99"
+    assert repo.get("b") == "b"
+    assert repo.n_adds == 2
+
+
+def test_add_async_flush(repo):
+    repo.add_async("a", "1")
+    with pytest.raises(name_resolve.NameEntryNotFoundError):
+        repo.get("a")
+    repo.flush()
+    assert repo.get("a") == "1"
+
+    # Writes issued after a flush are written as well.
+    repo.add_async("a", "2", replace=True)
+    repo.flush()
+    assert repo.get("a") == "2"
+    assert repo.n_adds == 2
+
+    # flush() without pending writes returns immediately.
+    repo.flush()
+
+
+def test_add_async_before_reset(repo):
+    repo.add_async("a", "1", delete_on_exit=True)
+    repo.reset()
+    time.sleep(2 * repo.ASYNC_COALESCE_SECONDS)
+    with pytest.raises(name_resolve.NameEntryNotFoundError):
+        repo.get("a")
+
+
+def test_add_async_error(repo, monkeypatch):
+    errors = []
+    monkeypatch.setattr(name_resolve.logger, "error", errors.append)
+    repo.add("a", "1")
+    repo.add_async("a", "2")
+    repo.add_async("b", "2")
+    repo.flush()
+    assert len(errors) == 1
+    assert "name a:" in errors[0]
+    # The failed write does not affect the others.
+    assert repo.get("a") == "1"
+    assert repo.get("b") == "2"
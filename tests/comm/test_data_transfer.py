@@ -0,0 +1,256 @@
+import collections
+import uuid
+from typing import *
+
+import pytest
+import torch
+import torch.distributed as dist
+
+import realhf.impl.model.comm.data_transfer as data_transfer
+from realhf.api.core.config import ModelName
+from realhf.api.core.data_api import SequenceSample
+from realhf.base import constants
+
+ACTOR = ModelName("actor", 0)
+REF = ModelName("ref", 0)
+CRITIC = ModelName("critic", 0)
+
+SRC_RANK = 0
+DST_RANK = 1
+
+PRODUCER_NAMES = {
+    "packed_input_ids": ACTOR,
+    "prompt_mask": ACTOR,
+    "logits_mask": ACTOR,
+    "values": ACTOR,
+    "rewards": REF,
+    "logprobs": REF,
+    "ref_logprobs": REF,
+}
+
+
+class _FakeGroup:
+
+    def __init__(self, ranks: List[int]):
+        self.ranks = ranks
+
+
+class _FakeWork:
+
+    def wait(self):
+        pass
+
+
+class _FakeP2POp:
+    # Newer versions of dist.P2POp look up the rank in the group on creation.
+
+    def __init__(self, op, tensor, peer, group=None):
+        self.op = op
+        self.tensor = tensor
+        self.peer = peer
+        self.group = group
+
+
+class _FakeWire:
+    """Delivers tensors and objects from the source rank to a destination
+    rank in the order they are issued.
+
+    The source rank and the destination rank are simulated one after
+    another in the same process.
+    """
+
+    def __init__(self):
+        self.rank = None
+        self.tensors = collections.deque()
+        self.objects = collections.deque()
+
+    def _send_or_recv(self, tensor: torch.Tensor, src: int):
+        if self.rank == src:
+            self.tensors.append(tensor.clone())
+            return
+        sent = self.tensors.popleft()
+        # The sender and the receiver must agree on the buffer layout.
+        assert tensor.shape == sent.shape, (tensor.shape, sent.shape)
+        assert tensor.dtype == sent.dtype, (tensor.dtype, sent.dtype)
+        tensor.copy_(sent)
+
+    def broadcast(self, tensor, src, group=None, async_op=False):
+        self._send_or_recv(tensor, src)
+        return _FakeWork() if async_op else None
+
+    def batch_isend_irecv(self, p2p_op_list):
+        for op in p2p_op_list:
+            src = self.rank if op.op is dist.isend else op.peer
+            self._send_or_recv(op.tensor, src)
+        return [_FakeWork() for _ in p2p_op_list]
+
+    def broadcast_object_list(self, objects, src, group=None):
+        if self.rank == src:
+            self.objects.append(list(objects))
+            return
+        sent = self.objects.popleft()
+        assert len(sent) == len(objects)
+        objects[:] = sent
+
+
+@pytest.fixture
+def wire(monkeypatch):
+    wire = _FakeWire()
+    monkeypatch.setattr(dist, "get_rank", lambda: wire.rank)
+    monkeypatch.setattr(dist, "get_process_group_ranks", lambda group: group.ranks)
+    monkeypatch.setattr(dist, "broadcast", wire.broadcast)
+    monkeypatch.setattr(dist, "P2POp", _FakeP2POp)
+    monkeypatch.setattr(dist, "batch_isend_irecv", wire.batch_isend_irecv)
+    monkeypatch.setattr(dist, "broadcast_object_list", wire.broadcast_object_list)
+    # Run on CPU: "GPU copies" are the tensors themselves.
+    monkeypatch.setattr(torch.cuda, "current_device", lambda: "cpu")
+    monkeypatch.setattr(torch.Tensor, "cuda", lambda self, *args, **kwargs: self)
+    buffer = constants.GlobalMemoryBuffer()
+    monkeypatch.setattr(constants, "get_global_memory_buffer", lambda: buffer)
+    return wire
+
+
+def _make_batch(bs: int, vocab_size: int = 16) -> SequenceSample:
+    slens = [int(torch.randint(2, 20, (1,))) for _ in range(bs)]
+    data = dict(
+        packed_input_ids=torch.cat([torch.randint(0, vocab_size, (l,)) for l in slens]),
+        prompt_mask=torch.cat(
+            [torch.randint(0, 2, (l,), dtype=torch.bool) for l in slens]
+        ),
+        logits_mask=torch.cat(
+            [torch.randint(0, 2, (l, vocab_size), dtype=torch.bool) for l in slens]
+        ),
+        values=None,
+        rewards=torch.randn(bs),
+        logprobs=torch.cat([torch.randn(l - 1) for l in slens]),
+        ref_logprobs=torch.cat(
+            [torch.randn(l - 1, dtype=torch.float16) for l in slens]
+        ),
+    )
+    return SequenceSample.from_default(
+        ids=[uuid.uuid4() for _ in range(bs)],
+        seqlens=slens,
+        data=data,
+        metadata=dict(a=list(range(bs))),
+    )
+
+
+def _make_plan(batch: SequenceSample, keys: List[str], dst_ranks: List[int]):
+    groups, src_ranks, all_dst_ranks = {}, {}, {}
+    for src in [ACTOR, REF]:
+        key = data_transfer.DataTransferPair(
+            src=src, src_dp_rank=0, dst=CRITIC, dst_dp_rank=0
+        )
+        groups[key] = _FakeGroup([SRC_RANK] + dst_ranks)
+        src_ranks[key] = SRC_RANK
+        all_dst_ranks[key] = dst_ranks
+    mapping = {0: list(range(batch.bs))}
+    return data_transfer.derive_data_transfer_plan(
+        keys=keys,
+        global_ids=batch.ids,
+        consumer_name=CRITIC,
+        consumer_mapping=mapping,
+        producer_names=PRODUCER_NAMES,
+        producer_mappings={(v, k): mapping for k, v in PRODUCER_NAMES.items()},
+        data_transfer_info=data_transfer.DataTransferInfo(
+            data_transfer_groups=groups,
+            data_transfer_src_ranks=src_ranks,
+            data_transfer_dst_ranks=all_dst_ranks,
+        ),
+    )
+
+
+def _make_tables():
+    return (
+        collections.defaultdict(lambda: collections.defaultdict(set)),
+        collections.defaultdict(lambda: collections.defaultdict(set)),
+    )
+
+
+def _run(wire, rank, comm_plan, batch, storage, tables):
+    wire.rank = rank
+    data_transfer.run_data_transfer(comm_plan, batch.meta(), storage, *tables)
+
+
+def _check_received(batch: SequenceSample, storage, keys: List[str]):
+    assert set(storage.keys()) == set(batch.ids)
+    for x in batch.unpack():
+        y = storage[x.ids[0]]
+        assert set(keys).issubset(y.keys)
+        assert y.metadata == x.metadata
+        for k in keys:
+            assert y.seqlens[k] == x.seqlens[k]
+            if x.data[k] is None:
+                assert y.data[k] is None
+                continue
+            assert y.dtypes[k] == x.dtypes[k]
+            assert y.trailing_shapes[k] == x.trailing_shapes[k]
+            assert torch.equal(y.data[k], x.data[k]), k
+
+
+@pytest.mark.parametrize("dst_ranks", [[DST_RANK], [DST_RANK, 2]])
+@pytest.mark.parametrize("bs", [1, 5])
+def test_data_transfer_roundtrip(wire, bs, dst_ranks):
+    batch = _make_batch(bs)
+    keys = sorted(PRODUCER_NAMES.keys())
+    comm_plan = _make_plan(batch, keys, dst_ranks)
+    src_storage = {x.ids[0]: x for x in batch.unpack()}
+    dst_storage = {}
+
+    _run(wire, SRC_RANK, comm_plan, batch, src_storage, _make_tables())
+    _run(wire, DST_RANK, comm_plan, batch, dst_storage, _make_tables())
+    assert len(wire.tensors) == 0 and len(wire.objects) == 0
+    _check_received(batch, dst_storage, keys)
+
+
+def test_data_transfer_cache(wire):
+    batch = _make_batch(4)
+    actor_keys = [k for k, v in PRODUCER_NAMES.items() if v == ACTOR]
+    ref_keys = [k for k, v in PRODUCER_NAMES.items() if v == REF]
+    all_keys = sorted(PRODUCER_NAMES.keys())
+    src_storage = {x.ids[0]: x for x in batch.unpack()}
+    dst_storage = {}
+    src_tables, dst_tables = _make_tables(), _make_tables()
+
+    def _transfer(keys):
+        comm_plan = _make_plan(batch, keys, [DST_RANK])
+        _run(wire, SRC_RANK, comm_plan, batch, src_storage, src_tables)
+        n_sent = len(wire.tensors)
+        _run(wire, DST_RANK, comm_plan, batch, dst_storage, dst_tables)
+        assert len(wire.tensors) == 0 and len(wire.objects) == 0
+        return n_sent
+
+    def _n_buffers(keys):
+        # One buffer is sent per dtype.
+        return len({batch.dtypes[k] for k in keys if batch.dtypes[k] is not None})
+
+    assert _transfer(actor_keys) == _n_buffers(actor_keys)
+    _check_received(batch, dst_storage, actor_keys)
+    # Transferring the same keys over the same group again is a no-op.
+    assert _transfer(actor_keys) == 0
+    # Only the keys that have not been transferred are sent.
+    assert _transfer(all_keys) == _n_buffers(ref_keys)
+    _check_received(batch, dst_storage, all_keys)
+
+
+def test_data_transfer_send_buffers_bounded(wire):
+    batch = _make_batch(4)
+    keys = sorted(PRODUCER_NAMES.keys())
+    # Transfers to different groups are not cached, so the sender runs
+    # more send steps than there are staging buffers.
+    comm_plan = _make_plan(batch, keys, [DST_RANK]) + _make_plan(
+        batch, keys, [DST_RANK, 2]
+    )
+    assert (
+        sum(isinstance(s, data_transfer.DataTransferSenderStep) for s in comm_plan)
+        > data_transfer._N_SEND_BUFFERS
+    )
+    src_storage = {x.ids[0]: x for x in batch.unpack()}
+    dst_storage = {}
+
+    _run(wire, SRC_RANK, comm_plan, batch, src_storage, _make_tables())
+    _run(wire, DST_RANK, comm_plan, batch, dst_storage, _make_tables())
+    assert len(wire.tensors) == 0 and len(wire.objects) == 0
+    _check_received(batch, dst_storage, keys)
+    buf_names = {name for name, _ in constants.get_global_memory_buffer().buffer}
+    assert len(buf_names) == data_transfer._N_SEND_BUFFERS
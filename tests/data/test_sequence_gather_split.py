@@ -168,25 +168,27 @@ def recursive_assert_equal(x1, x2):
         assert x1 == x2
 
 
-@pytest.mark.parametrize(
-    "sample_type", ["single", "single_with_none", "pair", "multi_sample"]
-)
-@pytest.mark.parametrize("dp", [1, 2, 3, 4, 8, 15, 16])
-def test_gather_split(sample_type: str, dp: int):
-    batch_sizes = [random.randint(1, 10) for _ in range(dp)]
+def _make_sample(sample_type: str, bs: int):
     if sample_type == "single":
-        samples = [_make_sample_single_sequence(bs) for bs in batch_sizes]
+        return _make_sample_single_sequence(bs)
     elif sample_type == "single_with_none":
-        samples = [
-            _make_sample_single_sequence(bs, data_with_none=True) for bs in batch_sizes
-        ]
+        return _make_sample_single_sequence(bs, data_with_none=True)
     elif sample_type == "pair":
-        samples = [_make_sample_multiple_sequence(bs) for bs in batch_sizes]
+        return _make_sample_multiple_sequence(bs)
     elif sample_type == "multi_sample":
-        samples = [_make_sample_single_prompt_multi_response(bs) for bs in batch_sizes]
+        return _make_sample_single_prompt_multi_response(bs)
     else:
         raise NotImplementedError()
 
+
+@pytest.mark.parametrize(
+    "sample_type", ["single", "single_with_none", "pair", "multi_sample"]
+)
+@pytest.mark.parametrize("dp", [1, 2, 3, 4, 8, 15, 16])
+def test_gather_split(sample_type: str, dp: int):
+    batch_sizes = [random.randint(1, 10) for _ in range(dp)]
+    samples = [_make_sample(sample_type, bs) for bs in batch_sizes]
+
     x = SequenceSample.gather(samples)
 
     # Test gather-split-gather cosistency
@@ -215,3 +217,16 @@ def test_gather_split(sample_type: str, dp: int):
         assert len(ss) == total_bs
         y = SequenceSample.gather(ss)
         recursive_assert_equal(x, y)
+
+
+@pytest.mark.parametrize(
+    "sample_type", ["single", "single_with_none", "pair", "multi_sample"]
+)
+@pytest.mark.parametrize("bs", [1, 2, 7])
+def test_unpack(sample_type: str, bs: int):
+    x = _make_sample(sample_type, bs)
+    ss = x.unpack()
+    expected = x.split_with_spec(SequenceSplitSpec(sizes=[1 for _ in range(bs)]))
+    assert len(ss) == len(expected) == bs
+    for s1, s2 in zip(ss, expected):
+        recursive_assert_equal(s1, s2)
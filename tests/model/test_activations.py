@@ -0,0 +1,41 @@
+import math
+
+import pytest
+import torch
+
+from realhf.impl.model.modules.activations import new_gelu_activation
+
+
+def _new_gelu_reference(x: torch.Tensor) -> torch.Tensor:
+    return (
+        0.5
+        * x
+        * (1.0 + torch.tanh(math.sqrt(2.0 / math.pi) * (x + 0.044715 * x.pow(3.0))))
+    )
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="This test requires GPU.")
+def test_new_gelu_decode_shapes_and_cuda_graph():
+    hidden_dim = 64
+    # Packed inputs change their shapes every decoding step.
+    for n_tokens in [1, 3, 17, 128, 5]:
+        x = torch.randn(n_tokens, hidden_dim, device="cuda")
+        torch.testing.assert_close(new_gelu_activation(x), _new_gelu_reference(x))
+
+    # Capture the activation in a CUDA graph, as decoding with `use_cuda_graph` does.
+    static_x = torch.randn(8, hidden_dim, device="cuda")
+    stream = torch.cuda.Stream()
+    stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(stream):
+        new_gelu_activation(static_x)
+    torch.cuda.current_stream().wait_stream(stream)
+    graph = torch.cuda.CUDAGraph()
+    with torch.cuda.graph(graph):
+        static_y = new_gelu_activation(static_x)
+
+    for _ in range(3):
+        x = torch.randn_like(static_x)
+        static_x.copy_(x)
+        graph.replay()
+        torch.cuda.synchronize()
+        torch.testing.assert_close(static_y, _new_gelu_reference(x))
@@ -0,0 +1,162 @@
+import asyncio
+import re
+import threading
+import time
+
+import pytest
+
+from realhf.scheduler.client import (
+    AsyncSchedulerClient,
+    SchedulerClient,
+    SchedulerError,
+    _array_cmd_formatter,
+    _make_matcher,
+)
+from realhf.scheduler.local.client import LocalSchedulerClient
+
+
+class _StubClient(SchedulerClient):
+
+    def __init__(self, fail=()):
+        super().__init__("expr", "trial")
+        self.fail = set(fail)
+        self.submitted = {}
+        self.lock = threading.Lock()
+
+    def submit(self, worker_type, cmd, **kwargs):
+        if worker_type in self.fail:
+            raise RuntimeError(f"cannot submit {worker_type}")
+        with self.lock:
+            self.submitted[worker_type] = (cmd, kwargs)
+
+
+@pytest.mark.parametrize(
+    "cmd",
+    [
+        "python3 -m apps.remote worker",
+        "worker --index {index} --count {count}",
+        "a {index:} b",
+        "{count:} {index}",
+        "{index!s} {count!r}",
+        "{index:03d}/{count:>4}",
+        "{{index}} {index}",
+        "}}{{ {count}",
+        "{index}{index}{count}",
+    ],
+)
+@pytest.mark.parametrize("count", [1, 12])
+def test_array_cmd_formatter(cmd, count):
+    format_cmd = _array_cmd_formatter(cmd, count)
+    for index in range(count):
+        assert format_cmd(index) == cmd.format(index=index, count=count)
+
+
+def test_array_cmd_formatter_unknown_field():
+    with pytest.raises(KeyError):
+        _array_cmd_formatter("{index} {name}", 2)(0)
+
+
+@pytest.mark.parametrize("fanout", [1, 4])
+def test_submit_batch(fanout):
+    client = _StubClient()
+    specs = [(f"w{i}", f"cmd {i}") for i in range(10)]
+    client.submit_batch(specs, fanout=fanout, nodelist="n1")
+    assert client.submitted == {w: (cmd, dict(nodelist="n1")) for w, cmd in specs}
+
+
+@pytest.mark.parametrize("fanout", [1, 4])
+def test_submit_batch_partial_failure(fanout):
+    client = _StubClient(fail=["w1", "w7"])
+    specs = [(f"w{i}", f"cmd {i}") for i in range(10)]
+    with pytest.raises(SchedulerError) as e:
+        client.submit_batch(specs, fanout=fanout)
+    msg = str(e.value)
+    assert msg.startswith("Failed to submit 2/10 jobs:\n")
+    assert "w1: cannot submit w1" in msg
+    assert "w7: cannot submit w7" in msg
+    # A failed submission does not stop the others.
+    assert set(client.submitted) == {w for w, _ in specs} - {"w1", "w7"}
+
+
+def test_submit_batch_sequential_by_default():
+    client = _StubClient()
+    threads = set()
+    submit = client.submit
+
+    def _submit(worker_type, cmd, **kwargs):
+        threads.add(threading.get_ident())
+        submit(worker_type, cmd, **kwargs)
+
+    client.submit = _submit
+    specs = [(f"w{i}", f"cmd {i}") for i in range(10)]
+    client.submit_batch(specs)
+    # `submit` is only called from the calling thread, and in order.
+    assert threads == {threading.get_ident()}
+    assert list(client.submitted) == [w for w, _ in specs]
+
+
+def test_submit_array():
+    client = _StubClient()
+    client.submit_array("worker", "run {index}/{count}", 3)
+    assert client.submitted == {f"worker_{i}": (f"run {i}/3", {}) for i in range(3)}
+
+
+def test_async_client_serializes_calls():
+    client = LocalSchedulerClient("expr", "trial")
+    in_flight, max_in_flight = 0, 0
+    submit_array = client.submit_array
+
+    def _submit_array(*args, **kwargs):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        # Widen the window in which unserialized calls would overlap.
+        time.sleep(0.01)
+        submit_array(*args, **kwargs)
+        in_flight -= 1
+
+    client.submit_array = _submit_array
+    async_client = AsyncSchedulerClient(client)
+
+    async def _submit_all():
+        await asyncio.gather(
+            *[async_client.submit("worker", "cmd", gpu=1) for _ in range(16)]
+        )
+
+    asyncio.run(_submit_all())
+    assert max_in_flight == 1
+    assert client._job_counter["worker"] == 16
+
+
+NAMES = [
+    "",
+    "actor",
+    "model_worker_0",
+    "model_worker_12",
+    "model_worker",
+    "master_worker_0",
+    "model_worker_0\nx",
+    "a.b",
+    "axb",
+]
+
+
+@pytest.mark.parametrize(
+    "job_name_regex",
+    [
+        ".*",
+        "model_worker.*",
+        "model_worker_.*",
+        "a.b.*",
+        "a.b",
+        "model_worker_[0-9]+",
+        "a\\.b",
+    ],
+)
+def test_make_matcher(job_name_regex):
+    match = _make_matcher(job_name_regex)
+    compiled_match = _make_matcher(re.compile(job_name_regex))
+    for name in NAMES:
+        expected = re.fullmatch(job_name_regex, name) is not None
+        assert match(name) == expected, name
+        assert compiled_match(name) == expected, name